@@ -5,16 +5,6 @@
 import math
 
 
-def symmetry(p_list, axis):
-	result = []
-	if(axis == 'x'):
-		for x, y in p_list:
-			result.append([x, -y])
-	else:
-		for x, y in p_list:
-			result.append([-x, y])
-	return result
-
 def draw_line(p_list, algorithm):
     """绘制线段
 
@@ -176,55 +166,81 @@ def draw_polygon(p_list, algorithm):
     return result
 
 
-def draw_ellipse(p_list):
-    """绘制椭圆（采用中点圆生成算法）
+def ellipse_quadrant(rx, ry, xs, ys):
+    """按中点椭圆算法计算以原点为中心的椭圆在第一象限（含坐标轴）的像素，追加到 xs、ys 中
 
-    :param p_list: (list of list of int: [[x0, y0], [x1, y1]]) 椭圆的矩形包围框左上角和右下角顶点坐标
-    :return: (list of list of int: [[x_0, y_0], [x_1, y_1], [x_2, y_2], ...]) 绘制结果的像素点坐标列表
+    :param rx: (int) x方向半轴长
+    :param ry: (int) y方向半轴长
+    :param xs: (list of int) 像素x坐标，原地追加
+    :param ys: (list of int) 像素y坐标，原地追加
     """
-    if hasattr(p_list, '__len__') == False or len(p_list) == 0:
-        return []
-    x0, y0 = p_list[0]
-    x1, y1 = p_list[1]
-    result = []
-    xc = (x0 + x1) // 2
-    yc = (y0 + y1) // 2
-    rx = abs(x1 - x0) // 2
-    ry = abs(y1 - y0) // 2
-
     rx2 = rx * rx
     ry2 = ry * ry
     p = ry2 * 4 - rx2 * ry * 4 + rx2
     x = 0
     y = ry
-    
+
     while ry2 * x < rx2 * y:
-        result.append([x, y])
-        if p < 0 :
+        xs.append(x)
+        ys.append(y)
+        if p < 0:
             p = p + 8 * ry2 * x + 12 * ry2
-            x = x + 1
-            y = y
         else:
             p = p + 8 * ry2 * x - 8 * rx2 * y + 8 * rx2 + 12 * ry2
-            x = x + 1
             y = y - 1
+        x = x + 1
 
     p = ry2 * (2 * x + 1)**2 + rx2 * (y - 1)**2 * 4 - rx2 * ry2 * 4
     while y >= 0:
-        result.append([x, y])
+        xs.append(x)
+        ys.append(y)
         if p < 0:
             p = p + 8 * ry2 * x - 8 * rx2 * y + 8 * ry2 + 12 * rx2
             x = x + 1
-            y = y - 1
         else:
             p = p - 8 * rx2 * y + 12 * rx2
-            x = x
-            y = y - 1
-            
-    resultx = symmetry(result, 'x')
-    resulty = symmetry(result, 'y')
-    result = result + resultx + resulty + symmetry(resultx, 'y')
-    result = translate(result, xc, yc)
+        y = y - 1
+
+
+def draw_ellipse(p_list):
+    """绘制椭圆（采用中点圆生成算法）
+
+    决策过程只计算一次第一象限，再按 (x, y)、(x, -y)、(-x, y)、(-x, -y) 的顺序直接写入平移后的四个象限，
+    位于坐标轴上的像素只在第一个出现它的象限中写入，每个像素只出现一次
+
+    :param p_list: (list of list of int: [[x0, y0], [x1, y1]]) 椭圆的矩形包围框左上角和右下角顶点坐标
+    :return: (list of list of int: [[x_0, y_0], [x_1, y_1], [x_2, y_2], ...]) 绘制结果的像素点坐标列表
+    """
+    if hasattr(p_list, '__len__') == False or len(p_list) == 0:
+        return []
+    x0, y0 = p_list[0]
+    x1, y1 = p_list[1]
+    xc = (x0 + x1) // 2
+    yc = (y0 + y1) // 2
+    xs = []
+    ys = []
+    ellipse_quadrant(abs(x1 - x0) // 2, abs(y1 - y0) // 2, xs, ys)
+
+    n = len(xs)
+    # x 单调不减、y 单调递减：x 为0的是开头若干个点，y 为0的只有末尾的点
+    head = 0
+    while head < n and xs[head] == 0:
+        head = head + 1
+    tail = 1 if n > 0 and ys[-1] == 0 else 0
+    result = [None] * (n + (n - tail) + (n - head) + max(n - head - tail, 0))
+    k = 0
+    for i in range(n):
+        result[k] = [xc + xs[i], yc + ys[i]]
+        k = k + 1
+    for i in range(n - tail):
+        result[k] = [xc + xs[i], yc - ys[i]]
+        k = k + 1
+    for i in range(head, n):
+        result[k] = [xc - xs[i], yc + ys[i]]
+        k = k + 1
+    for i in range(head, n - tail):
+        result[k] = [xc - xs[i], yc - ys[i]]
+        k = k + 1
     return result
 
 def Bezier(p_list, t):
@@ -316,10 +332,12 @@ def rotate(p_list, xc, yc, angle):
     if hasattr(p_list, '__len__') == False or len(p_list) == 0:
         return []
     theta = math.radians(angle)
+    cos = math.cos(theta)
+    sin = math.sin(theta)
     result = []
     for x, y in p_list:
-        result.append([int(xc + (x - xc) * math.cos(theta) + (y - yc) * math.sin(theta)),
-                       int(yc - (x - xc) * math.sin(theta) + (y - yc) * math.cos(theta))])
+        result.append([int(xc + (x - xc) * cos + (y - yc) * sin),
+                       int(yc - (x - xc) * sin + (y - yc) * cos)])
     return result
 
 
@@ -380,7 +398,7 @@ def clip(p_list, x0, y0, x1, y1, algorithm):
         if x0 == x1:
             if y0 > y1:
                 x0, y0, x1, y1 = x1, y1, x0, y0
-            result = [[x0, max(y0, y_min)], [x1, min(y1, y_min)]]
+            result = [[x0, max(y0, y_min)], [x1, min(y1, y_max)]]
             return result
     
         if y0 == y1:
@@ -0,0 +1,794 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+
+# cg_algorithms 的 NumPy 批量实现，供 cg_cli / cg_gui 使用
+# 所有结果与 cg_algorithms 中对应函数逐像素一致（包括像素顺序）
+# 像素结果统一为连续的 int32 数组，形状为 (N, 2)，每行为一个像素点 [x, y]
+# 填充图元的结果为水平区段，统一为 int32 数组，形状为 (K, 3)，每行为一个区段 [y, x_start, x_end]（闭区间），按 y、x_start 排序
+# draw_line_runs 的结果为水平或竖直的像素段，int32 数组，形状为 (K, 4)，每行为 [x0, y0, x1, y1]（x0 <= x1、y0 <= y1，闭区间）
+# draw_polygon、draw_curve 可选 unique 模式，结果为去重后每个像素第一次出现的子序列；draw_curve 的 adaptive 模式（算法名带 ADAPTIVE_SUFFIX 后缀）不与之逐像素一致
+import math
+import numpy as np
+
+
+def _empty():
+    return np.zeros((0, 2), np.int32)
+
+
+def unique_pixels(pixels):
+    """去掉重复的像素，每个像素只保留第一次出现的位置，顺序不变
+
+    先去掉与前一个像素相同的像素（曲线过采样产生的重复几乎都相邻，只需一次比较），
+    再将剩余像素的坐标编码为一个 int64 排序，找出不相邻的重复（如多边形的顶点、自交处）
+
+    :param pixels: (array-like of int, shape (N, 2)) 像素点坐标
+    :return: (np.ndarray of int32, shape (M, 2)) 去重后的像素点坐标
+    """
+    pixels = np.asarray(pixels, np.int32).reshape(-1, 2)
+    if len(pixels) < 2:
+        return pixels
+    keep = np.empty(len(pixels), bool)
+    keep[0] = True
+    np.any(pixels[1:] != pixels[:-1], axis = 1, out = keep[1:])
+    pixels = pixels[keep]
+    key = (pixels[:, 0].astype(np.int64) << 32) | (pixels[:, 1].astype(np.int64) & 0xffffffff)
+    key, first = np.unique(key, return_index = True)
+    if len(first) == len(pixels):
+        return pixels
+    return pixels[np.sort(first)]
+
+
+def _empty_spans():
+    return np.zeros((0, 3), np.int32)
+
+
+def merge_spans(spans):
+    """合并同一行上重叠或相接的区段，结果按 y、x_start 排序
+
+    :param spans: (array-like of int, shape (K, 3)) 水平区段 [y, x_start, x_end]
+    :return: (np.ndarray of int32, shape (L, 3)) 合并后的区段
+    """
+    spans = np.asarray(spans, np.int64).reshape(-1, 3)
+    if len(spans) == 0:
+        return _empty_spans()
+    spans = spans[np.lexsort((spans[:, 1], spans[:, 0]))]
+    y, xs, xe = spans[:, 0], spans[:, 1], spans[:, 2]
+    # 行号乘以足够大的倍数后与 x_end 相加，整体的累计最大值即为各行内 x_end 的累计最大值
+    base = int(xs.min())
+    scale = int(xe.max()) - base + 2
+    key = (y - y[0]) * scale + (xe - base)
+    reach = np.maximum.accumulate(key) - (y - y[0]) * scale + base
+    start = np.ones(len(spans), bool)
+    start[1:] = (y[1:] != y[:-1]) | (xs[1:] > reach[:-1] + 1)
+    first = np.nonzero(start)[0]
+    last = np.concatenate((first[1:], [len(spans)])) - 1
+    return np.stack([y[first], xs[first], reach[last]], axis = 1).astype(np.int32)
+
+
+def span_pixels(spans):
+    """将水平区段展开为像素点坐标
+
+    :param spans: (np.ndarray of int, shape (K, 3)) 水平区段 [y, x_start, x_end]
+    :return: (np.ndarray of int32, shape (M, 2)) 像素点坐标，按区段顺序排列
+    """
+    spans = np.asarray(spans, np.int64).reshape(-1, 3)
+    counts = np.maximum(spans[:, 2] - spans[:, 1] + 1, 0)
+    owner = np.repeat(np.arange(len(spans)), counts)
+    pixels = np.empty((int(counts.sum()), 2), np.int32)
+    pixels[:, 0] = spans[owner, 1] + np.arange(len(owner)) - np.concatenate(([0], np.cumsum(counts)))[owner]
+    pixels[:, 1] = spans[owner, 0]
+    return pixels
+
+
+def _accumulate(start, step, counts):
+    """按行累加浮点数，与 Python 中 v = v + step 的逐次累加结果完全一致
+
+    :param start: (np.ndarray of float) 每条线段的初值
+    :param step: (np.ndarray of float) 每条线段的步长
+    :param counts: (np.ndarray of int) 每条线段的采样个数
+    :return: (np.ndarray of float) 所有线段的累加序列依次拼接的结果
+    """
+    result = np.empty(int(counts.sum()), np.float64)
+    offsets = np.concatenate(([0], np.cumsum(counts)))
+    # 按长度分桶（同一桶内长度相差不超过两倍），每桶用一个二维数组逐行累加
+    buckets = np.log2(np.maximum(counts, 1)).astype(np.int64)
+    for b in np.unique(buckets):
+        rows = np.nonzero(buckets == b)[0]
+        width = int(counts[rows].max())
+        table = np.empty((len(rows), width), np.float64)
+        table[:, 0] = start[rows]
+        table[:, 1:] = step[rows, None]
+        np.add.accumulate(table, axis = 1, out = table)
+        valid = np.arange(width) < counts[rows, None]
+        index = offsets[rows, None] + np.arange(width)
+        result[index[valid]] = table[valid]
+    return result
+
+
+def draw_lines(segments, algorithm):
+    """批量绘制线段
+
+    :param segments: (array-like of int, shape (N, 2, 2)) N条线段的起点和终点坐标
+    :param algorithm: (string) 绘制使用的算法，包括'Naive'、'DDA'和'Bresenham'
+    :return: (np.ndarray of int32, shape (M, 2), np.ndarray of int64, shape (N + 1,))
+             所有线段的像素点坐标，以及第i条线段的像素位于 pixels[offsets[i]:offsets[i + 1]]
+    """
+    seg = np.asarray(segments, np.int64).reshape(-1, 2, 2)
+    x0, y0 = seg[:, 0, 0].copy(), seg[:, 0, 1].copy()
+    x1, y1 = seg[:, 1, 0].copy(), seg[:, 1, 1].copy()
+
+    # 与 draw_line 相同：竖直线单独处理，其余线段保证 x0 < x1
+    vertical = x0 == x1
+    swap = x0 > x1
+    x0[swap], x1[swap] = x1[swap], x0[swap]
+    y0[swap], y1[swap] = y1[swap], y0[swap]
+    dx = x1 - x0
+    dy = y1 - y0
+    horizontal = ~vertical & (dy == 0)
+    diagonal = ~vertical & ~horizontal & ((dx == dy) | (dx == -dy))
+    ordinary = ~vertical & ~horizontal & ~diagonal
+    if algorithm not in ('Naive', 'DDA', 'Bresenham'):
+        ordinary[:] = False
+    # Naive 算法对陡峭线段同样按 x 逐列采样
+    steep = ordinary & (np.abs(dy) > dx) & (algorithm != 'Naive')
+
+    counts = np.where(vertical | steep, np.abs(dy), dx) + 1
+    counts[~(vertical | horizontal | diagonal | ordinary)] = 0
+    offsets = np.concatenate(([0], np.cumsum(counts)))
+
+    # 每个像素所属的线段编号 s 以及它在该线段中的序号 i
+    s = np.repeat(np.arange(len(seg)), counts)
+    i = np.arange(offsets[-1]) - offsets[s]
+    x = np.empty(offsets[-1], np.int64)
+    y = np.empty(offsets[-1], np.int64)
+
+    mask = vertical[s]
+    x[mask] = x0[s[mask]]
+    y[mask] = np.minimum(y0, y1)[s[mask]] + i[mask]
+
+    mask = (horizontal | diagonal | ordinary & ~steep)[s]
+    x[mask] = x0[s[mask]] + i[mask]
+    mask = horizontal[s]
+    y[mask] = y0[s[mask]]
+    mask = diagonal[s]
+    y[mask] = y0[s[mask]] + np.sign(dy[s[mask]]) * i[mask]
+
+    if algorithm == 'Naive':
+        mask = ordinary[s]
+        k = dy[ordinary] / dx[ordinary]
+        y[mask] = (y0[s[mask]] + np.repeat(k, counts[ordinary]) * i[mask]).astype(np.int64)
+
+    elif algorithm == 'DDA':
+        shallow = ordinary & ~steep
+        mask = shallow[s]
+        m = dy[shallow].astype(np.float64) / dx[shallow].astype(np.float64)
+        y[mask] = np.rint(_accumulate(y0[shallow].astype(np.float64), m, counts[shallow]))
+        mask = steep[s]
+        M = dx[steep].astype(np.float64) / dy[steep].astype(np.float64)
+        M = np.where(dy[steep] > 0, M, -M)
+        x[mask] = np.rint(_accumulate(x0[steep].astype(np.float64), M, counts[steep]))
+        y[mask] = y0[s[mask]] + np.sign(dy[s[mask]]) * i[mask]
+
+    elif algorithm == 'Bresenham':
+        # 决策参数的累计结果可写成闭式：第i步时短轴方向已前进 (2 * 短 * i + 长 - 1) // (2 * 长) 格
+        ady = np.abs(dy)
+        shallow = ordinary & ~steep
+        mask = shallow[s]
+        sm = s[mask]
+        y[mask] = y0[sm] + np.sign(dy[sm]) * ((2 * ady[sm] * i[mask] + dx[sm] - 1) // (2 * dx[sm]))
+        mask = steep[s]
+        sm = s[mask]
+        x[mask] = x0[sm] + (2 * dx[sm] * i[mask] + ady[sm] - 1) // (2 * ady[sm])
+        y[mask] = y0[sm] + np.sign(dy[sm]) * i[mask]
+
+    pixels = np.empty((offsets[-1], 2), np.int32)
+    pixels[:, 0] = x
+    pixels[:, 1] = y
+    return pixels, offsets
+
+
+def draw_line_runs(segments):
+    """批量绘制线段（run-length Bresenham），输出像素段而不是像素点
+
+    Bresenham 算法沿主轴走 L 步、副轴共前进 m 格（m <= L），第 i 步时副轴已前进 q(i) = (2mi + L - 1) // (2L) 格。
+    副轴坐标相同的像素连成一段，第 k 段从满足 q(i) >= k 的最小的 i 开始，
+    即 i = ceil((2Lk - L + 1) / (2m))，因此每条线段只需计算 m + 1 段的端点，计算量与段数而不是像素数成正比。
+    平缓的线段输出水平段，陡峭的线段输出竖直段，覆盖的像素与 draw_lines(segments, 'Bresenham') 完全相同
+
+    :param segments: (array-like of int, shape (N, 2, 2)) N条线段的起点和终点坐标
+    :return: (np.ndarray of int32, shape (K, 4), np.ndarray of int64, shape (N + 1,))
+             所有线段的像素段 [x0, y0, x1, y1]，以及第i条线段的像素段位于 runs[offsets[i]:offsets[i + 1]]
+    """
+    seg = np.asarray(segments, np.int64).reshape(-1, 2, 2)
+    x0, y0 = seg[:, 0, 0].copy(), seg[:, 0, 1].copy()
+    x1, y1 = seg[:, 1, 0].copy(), seg[:, 1, 1].copy()
+    # 与 draw_lines 相同，保证 x0 <= x1
+    swap = x0 > x1
+    x0[swap], x1[swap] = x1[swap], x0[swap]
+    y0[swap], y1[swap] = y1[swap], y0[swap]
+    dx = x1 - x0
+    dy = y1 - y0
+    sign = np.where(dy < 0, -1, 1)
+    steep = np.abs(dy) > dx
+    major = np.maximum(dx, np.abs(dy))
+    minor = np.minimum(dx, np.abs(dy))
+
+    counts = minor + 1
+    offsets = np.concatenate(([0], np.cumsum(counts)))
+    s = np.repeat(np.arange(len(seg)), counts)
+    k = np.arange(offsets[-1]) - offsets[s]
+    L, m = major[s], minor[s]
+    # 第 k 段的起止步数；m 为0时只有一段，覆盖整条线段
+    m1 = np.maximum(m, 1)
+    first = np.where(k == 0, 0, -((L - 2 * L * k - 1) // (2 * m1)))
+    last = np.where(k == m, L, -((L - 2 * L * (k + 1) - 1) // (2 * m1)) - 1)
+
+    runs = np.empty((offsets[-1], 4), np.int64)
+    st = steep[s]
+    # 平缓：主轴为 x，副轴为 y
+    runs[:, 0] = np.where(st, x0[s] + k, x0[s] + first)
+    runs[:, 2] = np.where(st, x0[s] + k, x0[s] + last)
+    ya = np.where(st, y0[s] + sign[s] * first, y0[s] + sign[s] * k)
+    yb = np.where(st, y0[s] + sign[s] * last, y0[s] + sign[s] * k)
+    runs[:, 1] = np.minimum(ya, yb)
+    runs[:, 3] = np.maximum(ya, yb)
+    return runs.astype(np.int32), offsets
+
+
+def run_pixels(runs):
+    """将水平或竖直的像素段展开为像素点坐标
+
+    :param runs: (np.ndarray of int, shape (K, 4)) 像素段 [x0, y0, x1, y1]
+    :return: (np.ndarray of int32, shape (M, 2)) 像素点坐标，按像素段顺序排列
+    """
+    runs = np.asarray(runs, np.int64).reshape(-1, 4)
+    counts = (runs[:, 2] - runs[:, 0]) + (runs[:, 3] - runs[:, 1]) + 1
+    owner = np.repeat(np.arange(len(runs)), counts)
+    step = np.arange(len(owner)) - np.concatenate(([0], np.cumsum(counts)))[owner]
+    horizontal = (runs[:, 1] == runs[:, 3])[owner]
+    pixels = np.empty((len(owner), 2), np.int32)
+    pixels[:, 0] = runs[owner, 0] + np.where(horizontal, step, 0)
+    pixels[:, 1] = runs[owner, 1] + np.where(horizontal, 0, step)
+    return pixels
+
+
+def draw_line(p_list, algorithm):
+    """绘制线段
+
+    :param p_list: (list of list of int: [[x0, y0], [x1, y1]]) 线段的起点和终点坐标
+    :param algorithm: (string) 绘制使用的算法，包括'DDA'和'Bresenham'
+    :return: (np.ndarray of int32, shape (M, 2)) 绘制结果的像素点坐标
+    """
+    if hasattr(p_list, '__len__') == False or len(p_list) == 0:
+        return _empty()
+    pixels, offsets = draw_lines([p_list], algorithm)
+    return pixels
+
+
+def draw_polygon(p_list, algorithm, unique = False):
+    """绘制多边形
+
+    :param p_list: (array-like of int, shape (N, 2)) 多边形的顶点坐标列表
+    :param algorithm: (string) 绘制使用的算法，包括'DDA'和'Bresenham'
+    :param unique: (bool) 为 True 时每个像素只返回一次（各边拼接时顶点会出现两次）
+    :return: (np.ndarray of int32, shape (M, 2)) 绘制结果的像素点坐标
+    """
+    if hasattr(p_list, '__len__') == False or len(p_list) == 0:
+        return _empty()
+    p = np.asarray(p_list, np.int64).reshape(-1, 2)
+    pixels, offsets = draw_lines(np.stack([np.roll(p, 1, axis = 0), p], axis = 1), algorithm)
+    return unique_pixels(pixels) if unique else pixels
+
+
+def _ellipse_quadrant(rx, ry, flat):
+    """第一象限的决策过程与 cg_algorithms.ellipse_quadrant 相同，坐标依次追加到 flat 中"""
+    rx2 = rx * rx
+    ry2 = ry * ry
+    p = ry2 * 4 - rx2 * ry * 4 + rx2
+    x = 0
+    y = ry
+    while ry2 * x < rx2 * y:
+        flat += (x, y)
+        if p < 0:
+            p = p + 8 * ry2 * x + 12 * ry2
+        else:
+            p = p + 8 * ry2 * x - 8 * rx2 * y + 8 * rx2 + 12 * ry2
+            y = y - 1
+        x = x + 1
+
+    p = ry2 * (2 * x + 1)**2 + rx2 * (y - 1)**2 * 4 - rx2 * ry2 * 4
+    while y >= 0:
+        flat += (x, y)
+        if p < 0:
+            p = p + 8 * ry2 * x - 8 * rx2 * y + 8 * ry2 + 12 * rx2
+            x = x + 1
+        else:
+            p = p - 8 * rx2 * y + 12 * rx2
+        y = y - 1
+
+
+def draw_ellipses(p_lists):
+    """批量绘制椭圆
+
+    每个椭圆只计算一次第一象限，再将平移后的四个象限直接写入为所有椭圆预先分配的同一个数组，
+    顺序与 cg_algorithms.draw_ellipse 相同，坐标轴上的像素不重复
+
+    :param p_lists: (list of list of list of int: [[[x0, y0], [x1, y1]], ...]) N个椭圆的矩形包围框
+    :return: (np.ndarray of int32, shape (M, 2), np.ndarray of int64, shape (N + 1,))
+             所有椭圆的像素点坐标，以及第i个椭圆的像素位于 pixels[offsets[i]:offsets[i + 1]]
+    """
+    quadrants = []
+    for p_list in p_lists:
+        if hasattr(p_list, '__len__') == False or len(p_list) == 0:
+            quadrants.append((_empty(), 0, 0, 0, 0))
+            continue
+        x0, y0 = p_list[0]
+        x1, y1 = p_list[1]
+        flat = []
+        _ellipse_quadrant(abs(x1 - x0) // 2, abs(y1 - y0) // 2, flat)
+        quadrant = np.array(flat, np.int32).reshape(-1, 2)
+        # 第一象限中 x 单调不减、y 单调递减：x 为0的是开头 head 个点，y 为0的只有末尾的点
+        head = int(np.searchsorted(quadrant[:, 0], 1))
+        tail = 1 if len(flat) and flat[-1] == 0 else 0
+        quadrants.append((quadrant, head, tail, (x0 + x1) // 2, (y0 + y1) // 2))
+
+    sizes = [len(q) * 2 + max(len(q) - head - tail, 0) + len(q) - head - tail for q, head, tail, xc, yc in quadrants]
+    offsets = np.concatenate(([0], np.cumsum(sizes, dtype = np.int64)))
+    pixels = np.empty((offsets[-1], 2), np.int32)
+    for (quadrant, head, tail, xc, yc), start in zip(quadrants, offsets.tolist()):
+        # 依次写入 (x, y)、(x, -y)、(-x, y)、(-x, -y) 四个象限，坐标轴上的点只写入第一个出现它的象限
+        n = len(quadrant)
+        for part, sx, sy in ((quadrant, 1, 1), (quadrant[:n - tail], 1, -1),
+                             (quadrant[head:], -1, 1), (quadrant[head:n - tail], -1, -1)):
+            end = start + len(part)
+            out = pixels[start:end]
+            np.multiply(part, (sx, sy), out = out)
+            out += (xc, yc)
+            start = end
+    return pixels, offsets
+
+
+def draw_ellipse(p_list):
+    """绘制椭圆（采用中点圆生成算法）
+
+    :param p_list: (list of list of int: [[x0, y0], [x1, y1]]) 椭圆的矩形包围框左上角和右下角顶点坐标
+    :return: (np.ndarray of int32, shape (M, 2)) 绘制结果的像素点坐标
+    """
+    if hasattr(p_list, '__len__') == False or len(p_list) == 0:
+        return _empty()
+    pixels, offsets = draw_ellipses([p_list])
+    return pixels
+
+
+def Bezier(p_list, t):
+    """对一组参数 t 同时求 Bezier 曲线上的点
+
+    对整个 t 向量逐层执行 de Casteljau 递推，每层一次数组运算。
+    浮点运算的顺序与 cg_algorithms.Bezier 完全相同，因此 int 截断后的结果逐点一致
+    （改用 Bernstein 基或 Horner 形式会改变舍入，导致个别像素偏移）
+
+    :param p_list: (array-like of int, shape (n + 1, 2)) 控制点坐标
+    :param t: (np.ndarray of float, shape (S,)) 参数
+    :return: (np.ndarray of int32, shape (S, 2)) 曲线上的点
+    """
+    p = np.asarray(p_list, np.int64).reshape(-1, 2)
+    t = np.asarray(t, np.float64)
+    result = np.empty((len(t), 2), np.int32)
+    # 每层数组大小为 控制点数 × 采样数，分块处理以限制内存
+    chunk = max(1, (1 << 16) // len(p))
+    for start in range(0, len(t), chunk):
+        tc = t[start:start + chunk]
+        tc1 = 1 - tc
+        # level[j, axis, k]：当前层第j个点在第k个参数下的坐标，逐层原地更新
+        level = p[:, :, None] * np.ones_like(tc)
+        for n in range(len(p) - 1, 0, -1):
+            right = level[1:n + 1] * tc
+            level[:n] *= tc1
+            level[:n] += right
+        result[start:start + chunk] = level[0].T
+    return result
+
+
+def B_spline(p_list, u):
+    """对一组参数 u 同时求三次均匀B样条曲线上的点
+
+    均匀节点下参数 u 只落在一个区间 [f, f + 1) 内，只有 f - 3 到 f 这四个基函数非零。
+    对每个参数先定位区间，再用固定大小的三角形非递归地算出这四个基函数，全部参数一起做数组运算。
+    每个基函数的浮点运算与 cg_algorithms.deBoor_Cox 的递推完全相同，int 截断后的结果逐点一致
+    （改用预先乘好的 4×4 均匀三次矩阵在数学上等价，但舍入不同，会使少量像素偏移）
+
+    :param p_list: (array-like of int, shape (n + 1, 2)) 控制点坐标
+    :param u: (np.ndarray of float, shape (S,)) 节点空间中的参数，取值范围 [3, n + 1]
+    :return: (np.ndarray of int32, shape (S, 2)) 曲线上的点
+    """
+    p = np.asarray(p_list, np.int64).reshape(-1, 2)
+    u = np.asarray(u, np.float64)[:, None]
+    f = np.floor(u).astype(np.int64)
+    # basis[:, m] 为 N(f - 3 + m, k)，k 从 1 递推到 4，每次少一列
+    i = f + np.arange(-3, 4)
+    basis = (i == f).astype(np.float64)
+    for k in range(2, 5):
+        i = i[:, :-1]
+        basis = (basis[:, :-1] * (u - i) + basis[:, 1:] * (i + k - u)) / (k - 1)
+    # u = n + 1 时 f - 3 + 3 越界，其基函数为 0，权重置零即可
+    valid = i <= len(p) - 1
+    basis[~valid] = 0
+    control = p[np.where(valid, i, 0)]
+    x = control[:, 0, 0] * basis[:, 0]
+    y = control[:, 0, 1] * basis[:, 0]
+    for m in range(1, 4):
+        x = x + control[:, m, 0] * basis[:, m]
+        y = y + control[:, m, 1] * basis[:, m]
+    result = np.empty((len(u), 2), np.int32)
+    result[:, 0] = x
+    result[:, 1] = y
+    return result
+
+
+def adaptive_samples(evaluate, start, end, count, tolerance = 0.75):
+    """自适应地选取曲线的采样参数
+
+    从 count 段等分的参数区间开始，对两端采样点不相邻的区间求其 1/4、1/2、3/4 处的点：
+    任何一点偏离两端采样点连线上对应位置的点超过 tolerance 个像素时，将该区间在这三点处四等分，否则认为该区间足够平直。
+    只检查中点时，中点恰好落在连线上的 S 形区间也会被当作平直的，四分点可以发现这种情况。
+    每轮对所有待检查的区间一起求值，直到没有需要细分的区间
+
+    :param evaluate: (callable) 对一组参数求曲线上的点，如 lambda t: Bezier(p, t)
+    :param start: (float) 参数起点
+    :param end: (float) 参数终点
+    :param count: (int) 初始的区间数，应保证每段内曲线不会折返
+    :param tolerance: (float) 平直度的容差（像素）；采样点为整数像素，默认值使偏离达到一个像素的点都会引起细分
+    :return: (np.ndarray of int64, shape (S, 2)) 按参数顺序排列的采样点
+    """
+    t = np.linspace(start, end, count + 1)
+    points = evaluate(t).astype(np.int64)
+    active = np.ones(count, bool)
+    fractions = np.array([0.25, 0.5, 0.75])
+    # 区间上 1/4、1/2、3/4 处弦上的点乘以4后，为两端点分别乘以 (3, 2, 1) 与 (1, 2, 3) 之和
+    weights = np.array([[3, 1], [2, 2], [1, 3]])
+    # 区间长度不会无限缩小：浮点参数最多四等分约 26 次
+    for depth in range(27):
+        a, b = points[:-1][active], points[1:][active]
+        candidates = np.nonzero(active)[0]
+        far = np.abs(b - a).max(axis = 1) > 1
+        candidates, a, b = candidates[far], a[far], b[far]
+        if len(candidates) == 0:
+            break
+        inner_t = t[candidates, None] + (t[candidates + 1] - t[candidates])[:, None] * fractions
+        inner = evaluate(inner_t.ravel()).astype(np.int64).reshape(-1, 3, 2)
+        chord = weights[None, :, :1] * a[:, None] + weights[None, :, 1:] * b[:, None]
+        bent = np.abs(inner * 4 - chord).max(axis = (1, 2)) > tolerance * 4
+        active[:] = False
+        split = candidates[bent]
+        if len(split) == 0:
+            break
+        # 新插入的三个点把区间四等分，四段都需要在下一轮继续检查
+        at = np.repeat(split + 1, 3)
+        t = np.insert(t, at, inner_t[bent].ravel())
+        points = np.insert(points, at, inner[bent].reshape(-1, 2), axis = 0)
+        active = np.insert(active, at, True)
+        active[split + 3 * np.arange(len(split))] = True
+    return points
+
+
+# 曲线算法名加上该后缀（如 'Bezier-adaptive'）时按 adaptive 模式绘制，命令行和图形界面都通过算法名选择
+ADAPTIVE_SUFFIX = '-adaptive'
+
+
+def draw_curve(p_list, algorithm, unique = False, adaptive = False):
+    """绘制曲线
+
+    :param p_list: (list of list of int: [[x0, y0], [x1, y1], [x2, y2], ...]) 曲线的控制点坐标列表
+    :param algorithm: (string) 绘制使用的算法，包括'Bezier'和'B-spline'（三次均匀B样条曲线，曲线不必经过首末控制点），
+                      加上 ADAPTIVE_SUFFIX 后缀时相当于 adaptive 为 True
+    :param unique: (bool) 为 True 时每个像素只返回一次（采样数远多于覆盖的像素数，默认的结果中有大量重复）
+    :param adaptive: (bool) 为 True 时按 adaptive_samples 自适应采样，相邻采样点之间用 Bresenham 线段连接，
+                     结果总是连通且不重复；求值次数与曲线的弯曲程度而不是控制点包围盒的大小有关，
+                     像素与默认的等距过采样不完全相同
+    :return: (np.ndarray of int32, shape (M, 2)) 绘制结果的像素点坐标
+    """
+    if hasattr(p_list, '__len__') == False or len(p_list) == 0:
+        return _empty()
+    p = np.asarray(p_list, np.int64).reshape(-1, 2)
+    if algorithm.endswith(ADAPTIVE_SUFFIX):
+        algorithm = algorithm[:-len(ADAPTIVE_SUFFIX)]
+        adaptive = True
+    if adaptive:
+        return draw_curve_adaptive(p, algorithm)
+    w, h = p.max(axis = 0) - p.min(axis = 0) + 2
+    num = int(w + h) * int(np.sqrt(len(p)))
+    if algorithm == 'Bezier':
+        pixels = Bezier(p, np.arange(num + 1) / num)
+    elif algorithm == 'B-spline':
+        k = 3
+        n = len(p) - 1
+        if k > n + 1:
+            return _empty()
+        pixels = B_spline(p, k + np.arange(num + 1) / num * (n + 1 - k))
+    else:
+        return _empty()
+    return unique_pixels(pixels) if unique else pixels
+
+
+def draw_curve_adaptive(p, algorithm):
+    """自适应采样并连接相邻采样点，见 draw_curve"""
+    if algorithm == 'Bezier':
+        # n 次 Bezier 曲线的每个分量至多有 n - 1 个极值点，2n 段等分足以使各段内不折返
+        points = adaptive_samples(lambda t: Bezier(p, t), 0, 1, max(2 * (len(p) - 1), 1))
+    elif algorithm == 'B-spline':
+        k = 3
+        n = len(p) - 1
+        if k > n + 1:
+            return _empty()
+        # 每个节点区间上是一段三次曲线，各分为4段
+        points = adaptive_samples(lambda u: B_spline(p, u), k, n + 1, max(4 * (n + 1 - k), 1))
+    else:
+        return _empty()
+    pixels, offsets = draw_lines(np.stack([points[:-1], points[1:]], axis = 1), 'Bresenham')
+    if len(points) == 1:
+        pixels = points.astype(np.int32)
+    return unique_pixels(pixels)
+
+
+def fill_polygon(p_list):
+    """扫描线填充多边形（奇偶规则），中心位于多边形内部或边界上的像素都被填充
+
+    活性边表的批量形式：每条非水平边朝上定向，覆盖扫描线 [y_low, y_high)，
+    一次算出所有边与其覆盖的每条扫描线的交点（以整数分子、分母精确表示），按 (y, x) 排序后逐对配成区段；
+    局部最高的顶点和水平边不与任何扫描线相交，作为边界单独加入，最后合并同一行上的区段
+
+    :param p_list: (array-like of int, shape (N, 2)) 多边形的顶点坐标列表
+    :return: (np.ndarray of int32, shape (K, 3)) 水平区段 [y, x_start, x_end]
+    """
+    if hasattr(p_list, '__len__') == False or len(p_list) == 0:
+        return _empty_spans()
+    b = np.asarray(p_list, np.int64).reshape(-1, 2)
+    a = np.roll(b, 1, axis = 0)
+    low = np.where((a[:, 1] < b[:, 1])[:, None], a, b)
+    high = np.where((a[:, 1] < b[:, 1])[:, None], b, a)
+    slanted = low[:, 1] != high[:, 1]
+    low, high = low[slanted], high[slanted]
+
+    # 第 e 条边与扫描线 y 的交点 x = num / dy
+    dy = high[:, 1] - low[:, 1]
+    offsets = np.concatenate(([0], np.cumsum(dy)))
+    e = np.repeat(np.arange(len(dy)), dy)
+    y = low[e, 1] + np.arange(offsets[-1]) - offsets[e]
+    num = low[e, 0] * dy[e] + (y - low[e, 1]) * (high[e, 0] - low[e, 0])
+    whole = num // dy[e]
+    rest = num - whole * dy[e]
+    # 整数部分相同时再比较小数部分，坐标在百万以内时小数部分的浮点误差不影响顺序
+    order = np.lexsort((rest / dy[e], whole, y))
+    y, whole, rest = y[order], whole[order], rest[order]
+    # 每条扫描线上的交点个数为偶数，排序后相邻两个交点围成一个区段
+    spans = np.stack([y[0::2], whole[0::2] + (rest[0::2] > 0), whole[1::2]], axis = 1)
+
+    horizontal = (a[:, 1] == b[:, 1])
+    boundary = np.concatenate([
+        np.stack([b[:, 1], b[:, 0], b[:, 0]], axis = 1),
+        np.stack([b[horizontal, 1], np.minimum(a, b)[horizontal, 0], np.maximum(a, b)[horizontal, 0]], axis = 1)])
+    spans = np.concatenate([spans[spans[:, 1] <= spans[:, 2]], boundary])
+    return merge_spans(spans)
+
+
+def fill_ellipse(p_list):
+    """扫描线填充椭圆：每行从中点椭圆算法在该行的最左像素填充到最右像素，填充结果包含 draw_ellipse 的全部像素
+
+    :param p_list: (list of list of int: [[x0, y0], [x1, y1]]) 椭圆的矩形包围框左上角和右下角顶点坐标
+    :return: (np.ndarray of int32, shape (K, 3)) 水平区段 [y, x_start, x_end]，每行一个
+    """
+    if hasattr(p_list, '__len__') == False or len(p_list) == 0:
+        return _empty_spans()
+    x0, y0 = p_list[0]
+    x1, y1 = p_list[1]
+    xc = (x0 + x1) // 2
+    yc = (y0 + y1) // 2
+    flat = []
+    _ellipse_quadrant(abs(x1 - x0) // 2, abs(y1 - y0) // 2, flat)
+    quadrant = np.array(flat, np.int64).reshape(-1, 2)
+    # 第一象限中 y 单调递减、x 单调不减，每个 y 的最后一个点即该行最右的像素
+    last = np.ones(len(quadrant), bool)
+    last[:-1] = quadrant[1:, 1] != quadrant[:-1, 1]
+    x, y = quadrant[last, 0], quadrant[last, 1]
+    upper = np.stack([yc + y, xc - x, xc + x], axis = 1)[::-1]
+    lower = np.stack([yc - y, xc - x, xc + x], axis = 1)[y > 0]
+    return np.concatenate([lower, upper]).astype(np.int32)
+
+
+# 仿射变换表示为 (matrix, pivot)：点 p 变换为 pivot + matrix · (p - pivot)，matrix 为 3×3 齐次矩阵。
+# 单个平移、旋转、缩放选取与 cg_algorithms 中公式相同的形式，施加一次的结果与其逐点一致
+def translate_transform(dx, dy):
+    """平移变换
+
+    :param dx: (int) 水平方向平移量
+    :param dy: (int) 垂直方向平移量
+    :return: (tuple: (np.ndarray of float, shape (3, 3), tuple of float)) 变换矩阵及其中心
+    """
+    return np.array([[1, 0, dx], [0, 1, dy], [0, 0, 1]], np.float64), (0, 0)
+
+
+def rotate_transform(xc, yc, angle):
+    """旋转变换，以 (xc, yc) 为中心顺时针旋转 angle 度"""
+    theta = math.radians(angle)
+    c = math.cos(theta)
+    s = math.sin(theta)
+    return np.array([[c, s, 0], [-s, c, 0], [0, 0, 1]], np.float64), (xc, yc)
+
+
+def scale_transform(xc, yc, s):
+    """缩放变换，以 (xc, yc) 为中心缩放 s 倍"""
+    return np.array([[s, 0, xc * (1 - s)], [0, s, yc * (1 - s)], [0, 0, 1]], np.float64), (0, 0)
+
+
+def _shift(dx, dy):
+    return np.array([[1, 0, dx], [0, 1, dy], [0, 0, 1]], np.float64)
+
+
+def compose_transform(second, first):
+    """复合变换：先施加 first，再施加 second；结果沿用 first 的中心"""
+    matrix, (xc, yc) = second
+    absolute = _shift(xc, yc) @ matrix @ _shift(-xc, -yc)
+    xc, yc = first[1]
+    return _shift(-xc, -yc) @ absolute @ _shift(xc, yc) @ first[0], first[1]
+
+
+def apply_transform(p_list, transform):
+    """对一组点施加仿射变换，结果与 cg_algorithms 中的变换一样截断为整数
+
+    :param p_list: (array-like of int, shape (N, 2)) 点坐标
+    :param transform: (tuple: (np.ndarray, tuple)) 变换矩阵及其中心
+    :return: (np.ndarray of int64, shape (N, 2)) 变换后的点坐标
+    """
+    matrix, (xc, yc) = transform
+    p = np.asarray(p_list, np.float64).reshape(-1, 2)
+    dx = p[:, 0] - xc
+    dy = p[:, 1] - yc
+    x = xc + dx * matrix[0, 0] + dy * matrix[0, 1] + matrix[0, 2]
+    y = yc + dx * matrix[1, 0] + dy * matrix[1, 1] + matrix[1, 2]
+    return np.stack([x, y], axis = 1).astype(np.int64)
+
+
+def translate(p_list, dx, dy):
+    """平移变换
+
+    :param p_list: (array-like of int, shape (N, 2)) 图元参数
+    :param dx: (int) 水平方向平移量
+    :param dy: (int) 垂直方向平移量
+    :return: (np.ndarray of int64, shape (N, 2)) 变换后的图元参数
+    """
+    return apply_transform(p_list, translate_transform(dx, dy))
+
+
+def rotate(p_list, xc, yc, angle):
+    """旋转变换（除椭圆外），cos 和 sin 只计算一次，结果与 cg_algorithms.rotate 逐点一致
+
+    :param p_list: (array-like of int, shape (N, 2)) 图元参数
+    :param xc: (int) 旋转中心x坐标
+    :param yc: (int) 旋转中心y坐标
+    :param angle: (int) 顺时针旋转角度（°）
+    :return: (np.ndarray of int64, shape (N, 2)) 变换后的图元参数
+    """
+    return apply_transform(p_list, rotate_transform(xc, yc, angle))
+
+
+def scale(p_list, xc, yc, s):
+    """缩放变换
+
+    :param p_list: (array-like of int, shape (N, 2)) 图元参数
+    :param xc: (int) 缩放中心x坐标
+    :param yc: (int) 缩放中心y坐标
+    :param s: (float) 缩放倍数
+    :return: (np.ndarray of int64, shape (N, 2)) 变换后的图元参数
+    """
+    return apply_transform(p_list, scale_transform(xc, yc, s))
+
+
+def transform_lists(p_lists, function, *args):
+    """对一组图元的参数一次性施加同一个变换：所有点拼接为一个数组，只做一次向量化运算
+
+    :param p_lists: (list of array-like of int) 各图元的参数
+    :param function: (function) translate、rotate 或 scale
+    :param args: 变换的其余参数，如 translate 的 dx, dy
+    :return: (list of np.ndarray of int64) 各图元变换后的参数
+    """
+    if len(p_lists) == 0:
+        return []
+    counts = [len(p_list) for p_list in p_lists]
+    points = np.concatenate([np.asarray(p_list, np.int64).reshape(-1, 2) for p_list in p_lists])
+    return np.split(function(points, *args), np.cumsum(counts)[:-1])
+
+
+def clip_polygon(p_list, x0, y0, x1, y1):
+    """Sutherland-Hodgman 多边形裁剪：依次用窗口的左、右、下、上边界裁剪，每条边界对所有边一次性处理
+
+    :param p_list: (array-like of int, shape (N, 2)) 多边形的顶点坐标，也可以是任意凸多边形区域
+    :param x0: (int) 裁剪窗口一角的x坐标
+    :param y0: (int) 裁剪窗口一角的y坐标
+    :param x1: (int) 裁剪窗口对角的x坐标
+    :param y1: (int) 裁剪窗口对角的y坐标
+    :return: (np.ndarray of int64, shape (M, 2)) 裁剪后多边形的顶点坐标，交点截断为整数，去掉相邻的重复顶点；多边形完全位于窗口外时为空
+    """
+    p = np.asarray(p_list, np.float64).reshape(-1, 2)
+    boundaries = ((0, min(x0, x1), 1), (0, max(x0, x1), -1), (1, min(y0, y1), 1), (1, max(y0, y1), -1))
+    for axis, bound, sign in boundaries:
+        if len(p) == 0:
+            break
+        q = np.roll(p, 1, axis = 0)   # 每条边 q -> p 的起点
+        dp = (p[:, axis] - bound) * sign
+        dq = (q[:, axis] - bound) * sign
+        inside = dp >= 0
+        crossing = inside != (dq >= 0)
+        # 每条边依次输出：与边界的交点（如果穿过边界）、终点（如果在窗口内）
+        counts = crossing.astype(np.int64) + inside
+        ends = np.cumsum(counts)
+        result = np.empty((ends[-1], 2))
+        result[(ends - 1)[inside]] = p[inside]
+        t = dq[crossing] / (dq[crossing] - dp[crossing])
+        result[(ends - counts)[crossing]] = q[crossing] + t[:, None] * (p[crossing] - q[crossing])
+        result[(ends - counts)[crossing], axis] = bound
+        p = result
+    p = p.astype(np.int64)
+    if len(p) > 1:
+        keep = (p != np.roll(p, 1, axis = 0)).any(axis = 1)
+        p = p[keep] if keep.any() else p[:1]
+    return p
+
+
+def in_polygon(pixels, polygon):
+    """判断像素点是否位于凸多边形内（含边界）
+
+    :param pixels: (np.ndarray of int, shape (N, 2)) 像素点坐标
+    :param polygon: (array-like of int, shape (M, 2)) 凸多边形的顶点坐标，顺时针或逆时针排列均可
+    :return: (np.ndarray of bool, shape (N,)) 各像素点是否位于多边形内
+    """
+    polygon = np.asarray(polygon, np.int64).reshape(-1, 2)
+    x = pixels[:, 0].astype(np.int64)
+    y = pixels[:, 1].astype(np.int64)
+    if len(polygon) < 3:
+        # 退化为点或线段的区域只在其包围盒内为真
+        (x_min, y_min), (x_max, y_max) = polygon.min(axis = 0), polygon.max(axis = 0)
+        return (x >= x_min) & (x <= x_max) & (y >= y_min) & (y <= y_max)
+    positive = np.ones(len(pixels), bool)
+    negative = np.ones(len(pixels), bool)
+    for (xa, ya), (xb, yb) in zip(np.roll(polygon, 1, axis = 0).tolist(), polygon.tolist()):
+        cross = (xb - xa) * (y - ya) - (yb - ya) * (x - xa)
+        positive &= cross >= 0
+        negative &= cross <= 0
+    return positive | negative
+
+
+def clip_spans(spans, polygon):
+    """用凸多边形裁剪水平区段，保留的像素与 in_polygon 判断为在多边形内的像素相同
+
+    对每条边，在区段所在的行上求出满足叉积条件的 x 的范围（整数精确计算），各边的范围求交后与区段求交
+
+    :param spans: (np.ndarray of int, shape (K, 3)) 水平区段 [y, x_start, x_end]
+    :param polygon: (array-like of int, shape (M, 2)) 凸多边形的顶点坐标，顺时针或逆时针排列均可
+    :return: (np.ndarray of int32, shape (L, 3)) 裁剪后非空的区段
+    """
+    polygon = np.asarray(polygon, np.int64).reshape(-1, 2)
+    spans = np.asarray(spans, np.int64).reshape(-1, 3)
+    y, lo, hi = spans[:, 0], spans[:, 1].copy(), spans[:, 2].copy()
+    if len(polygon) < 3:
+        (x_min, y_min), (x_max, y_max) = polygon.min(axis = 0), polygon.max(axis = 0)
+        lo = np.maximum(lo, x_min)
+        hi = np.minimum(hi, x_max)
+        keep = (y >= y_min) & (y <= y_max) & (lo <= hi)
+        return np.stack([y, lo, hi], axis = 1)[keep].astype(np.int32)
+    a = np.roll(polygon, 1, axis = 0)
+    area = int(((a[:, 0] - polygon[:, 0]) * (a[:, 1] + polygon[:, 1])).sum())
+    # 逆时针（面积为正）时要求所有叉积 >= 0，顺时针时要求 <= 0，统一为 sign * cross >= 0
+    sign = 1 if area >= 0 else -1
+    keep = np.ones(len(spans), bool)
+    for (xa, ya), (xb, yb) in zip(a.tolist(), polygon.tolist()):
+        # sign * ((xb - xa) * (y - ya) - (yb - ya) * (x - xa)) >= 0，即 k * x <= c
+        k = sign * (yb - ya)
+        c = sign * ((xb - xa) * (y - ya) + (yb - ya) * xa)
+        if k > 0:
+            hi = np.minimum(hi, c // k)
+        elif k < 0:
+            lo = np.maximum(lo, -(c // -k))
+        else:
+            keep &= c >= 0
+    keep &= lo <= hi
+    return np.stack([y, lo, hi], axis = 1)[keep].astype(np.int32)
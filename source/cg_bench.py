@@ -0,0 +1,202 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+
+# 绘图算法的微基准测试：对 cg_algorithms（或接口相同的 cg_algorithms_np）的各个函数运行固定的负载，
+# 报告每秒绘制的像素数或处理的点数，结果可保存为 JSON，并与保存的基线比较以发现性能退化
+#
+# 用法：python cg_bench.py [--module cg_algorithms_np] [--filter curve] [--save new.json] [--baseline old.json]
+import sys
+import math
+import time
+import json
+import random
+import argparse
+import platform
+import importlib
+from collections import namedtuple
+
+
+Case = namedtuple('Case', ['name', 'function', 'calls', 'unit'])
+Case.__doc__ = '''一项基准测试
+
+:param name: (string) 名称，如'line/DDA/long/octant0'
+:param function: (string) 被测函数在模块中的名字
+:param calls: (list of tuple) 一轮测试中依次传给被测函数的参数
+:param unit: (string) 吞吐量的单位，'px'为返回的像素数，'pts'为输入的点数，'spans'为输入的水平区段数
+'''
+
+OCTANTS = 8
+LINE_LENGTHS = {'short': (8, 200), 'long': (1000, 20)}     # 线段长度, 每轮线段数
+ELLIPSES = [(2000, 1000), (4000, 100), (500, 500)]
+CURVE_SIZES = [4, 16, 64, 500]
+CURVE_BOX = 32          # 曲线控制点所在正方形的边长；500 个控制点的 Bezier 曲线在纯 Python 实现下约需一分钟
+TRANSFORM_POINTS = 100000
+CLIP_LINES = 1000
+CLIP_POLYGONS = (200, 64)       # 多边形数, 每个多边形的顶点数
+CLIP_SPANS = 100000
+
+
+def build_cases(seed = 0):
+    """生成所有基准测试，参数由固定的随机种子生成，每次运行完全相同
+
+    :param seed: (int) 随机种子
+    :return: (list of Case) 基准测试列表
+    """
+    r = random.Random(seed)
+    cases = []
+    for algorithm in ('DDA', 'Bresenham'):
+        for label, (length, count) in LINE_LENGTHS.items():
+            for octant in range(OCTANTS):
+                # 方向取在卦限正中，保证线段落在该卦限内
+                angle = math.radians(octant * 45 + 22.5)
+                dx = int(round(length * math.cos(angle)))
+                dy = int(round(length * math.sin(angle)))
+                calls = []
+                for i in range(count):
+                    x0, y0 = r.randint(0, 1000), r.randint(0, 1000)
+                    calls.append(([[x0, y0], [x0 + dx, y0 + dy]], algorithm))
+                cases.append(Case('line/%s/%s/octant%d' % (algorithm, label, octant), 'draw_line', calls, 'px'))
+    for rx, ry in ELLIPSES:
+        calls = [([[-rx, ry], [rx, -ry]],)]
+        cases.append(Case('ellipse/%dx%d' % (rx, ry), 'draw_ellipse', calls, 'px'))
+    for algorithm in ('Bezier', 'B-spline'):
+        for n in CURVE_SIZES:
+            p_list = [[r.randint(0, CURVE_BOX), r.randint(0, CURVE_BOX)] for i in range(n)]
+            cases.append(Case('curve/%s/%d' % (algorithm, n), 'draw_curve', [(p_list, algorithm)], 'px'))
+    p_list = [[r.randint(-1000, 1000), r.randint(-1000, 1000)] for i in range(TRANSFORM_POINTS)]
+    cases.append(Case('translate/%d' % TRANSFORM_POINTS, 'translate', [(p_list, 17, -23)], 'pts'))
+    cases.append(Case('rotate/%d' % TRANSFORM_POINTS, 'rotate', [(p_list, 12, 34, 37)], 'pts'))
+    cases.append(Case('scale/%d' % TRANSFORM_POINTS, 'scale', [(p_list, 12, 34, 0.7)], 'pts'))
+    lines = [[[r.randint(-200, 700), r.randint(-200, 700)], [r.randint(-200, 700), r.randint(-200, 700)]] for i in range(CLIP_LINES)]
+    for algorithm in ('Cohen-Sutherland', 'Liang-Barsky'):
+        calls = [(p_list, 0, 0, 500, 500, algorithm) for p_list in lines]
+        cases.append(Case('clip/%s' % algorithm, 'clip', calls, 'pts'))
+    # cg_algorithms_np 没有逐条线段的 clip，用它的多边形裁剪和区段裁剪覆盖裁剪路径
+    count, n = CLIP_POLYGONS
+    calls = [([[r.randint(-200, 700), r.randint(-200, 700)] for j in range(n)], 0, 0, 500, 500) for i in range(count)]
+    cases.append(Case('clip/Sutherland-Hodgman', 'clip_polygon', calls, 'pts'))
+    spans = []
+    for i in range(CLIP_SPANS):
+        x = r.randint(-200, 700)
+        spans.append([r.randint(-200, 700), x, x + r.randint(0, 300)])
+    window = [[0, 250], [250, 0], [500, 250], [250, 500]]
+    cases.append(Case('clip/spans', 'clip_spans', [(spans, window)], 'spans'))
+    return cases
+
+
+def run_case(module, case, min_time = 0.2, repeat = 3):
+    """运行一项基准测试：至少运行 repeat 轮且总时间不少于 min_time 秒，取最快一轮
+
+    :param module: (module) 被测模块
+    :param case: (Case) 基准测试
+    :param min_time: (float) 最短总运行时间（秒）
+    :param repeat: (int) 最少运行轮数
+    :return: (dict) 最快一轮的时间（秒）、处理量、单位和吞吐量（每秒）
+    """
+    function = getattr(module, case.function)
+    best = math.inf
+    total = 0
+    rounds = 0
+    while rounds < repeat or total < min_time:
+        units = 0
+        start = time.perf_counter()
+        for args in case.calls:
+            result = function(*args)
+            units += len(result) if case.unit == 'px' else len(args[0])
+        elapsed = time.perf_counter() - start
+        best = min(best, elapsed)
+        total += elapsed
+        rounds += 1
+        if elapsed > min_time:
+            # 单轮已经足够长（如纯 Python 的大曲线），不再重复
+            break
+    return {'seconds': best, 'units': units, 'unit': case.unit, 'rate': units / best if best > 0 else math.inf}
+
+
+def compare(results, baseline):
+    """与基线比较吞吐量
+
+    :param results: (dict of str: dict) 本次结果
+    :param baseline: (dict of str: dict) 基线结果
+    :return: (list of (string, float)) 两者都有的测试的名称及吞吐量之比（本次/基线），按名称排序；
+             基线中有而本次没有的测试由 missing 列出
+    """
+    return [(name, results[name]['rate'] / baseline[name]['rate'])
+            for name in sorted(results) if usable(baseline.get(name))]
+
+
+def usable(entry):
+    """基线中的一项能否用于比较：存在且吞吐量为有限的正数（耗时为 0 时保存的吞吐量为 0 或无穷大）"""
+    return entry is not None and 0 < entry['rate'] < math.inf
+
+
+def unusable(results, baseline):
+    """本次运行了、基线中也有但其吞吐量无法用于比较的测试，按名称排序"""
+    return sorted(name for name in results if name in baseline and not usable(baseline[name]))
+
+
+def missing(results, baseline):
+    """基线中有而本次没有运行的测试（如被测模块没有相应函数），按名称排序"""
+    return sorted(name for name in baseline if name not in results)
+
+
+def format_rate(rate, unit):
+    for scale, prefix in ((1e9, 'G'), (1e6, 'M'), (1e3, 'k')):
+        if rate >= scale:
+            return '%.2f %s%s/s' % (rate / scale, prefix, unit)
+    return '%.2f %s/s' % (rate, unit)
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = 'Microbenchmarks for the drawing algorithms')
+    parser.add_argument('--module', default = 'cg_algorithms', help = 'module to benchmark, e.g. cg_algorithms_np')
+    parser.add_argument('--filter', default = '', help = 'only run cases whose name contains this string')
+    parser.add_argument('--min-time', type = float, default = 0.2, help = 'minimum total seconds per case')
+    parser.add_argument('--save', help = 'write the results to this JSON file')
+    parser.add_argument('--baseline', help = 'compare against results saved by --save')
+    parser.add_argument('--threshold', type = float, default = 0.1, help = 'flag cases whose throughput drops by more than this fraction')
+    args = parser.parse_args(argv)
+
+    module = importlib.import_module(args.module)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as fp:
+            baseline = json.load(fp)['results']
+
+    results = {}
+    for case in build_cases():
+        if args.filter not in case.name:
+            continue
+        if not hasattr(module, case.function):
+            print('%-36s skipped: %s has no %s' % (case.name, args.module, case.function), flush = True)
+            continue
+        result = run_case(module, case, args.min_time)
+        results[case.name] = result
+        line = '%-36s %10.3f ms %18s' % (case.name, result['seconds'] * 1000, format_rate(result['rate'], result['unit']))
+        if baseline is not None and case.name in baseline and not usable(baseline[case.name]):
+            line += '  no baseline'
+        elif baseline is not None and case.name in baseline:
+            line += '  %+6.1f%%' % ((result['rate'] / baseline[case.name]['rate'] - 1) * 100)
+        print(line, flush = True)
+
+    if args.save:
+        with open(args.save, 'w') as fp:
+            json.dump({'module': args.module, 'python': platform.python_version(), 'machine': platform.machine(),
+                       'results': results}, fp, indent = 2, sort_keys = True)
+
+    if baseline is not None:
+        for name in missing(results, baseline):
+            if args.filter in name:
+                print('MISSING %s: in baseline but not run' % name)
+        for name in unusable(results, baseline):
+            print('NO BASELINE %s: baseline rate is %r' % (name, baseline[name]['rate']))
+        regressions = [(name, ratio) for name, ratio in compare(results, baseline) if ratio < 1 - args.threshold]
+        for name, ratio in regressions:
+            print('REGRESSION %s: %.1f%% slower than baseline' % (name, (1 - ratio) * 100))
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,696 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+
+# 图元到画布：批量光栅化、像素缓存、裁剪以及分块并行合成
+# 画布为 (height, width, 3) 的 uint8 数组，图元坐标 (x, y) 对应画布的 [height - 1 - y, x]
+# 椭圆和曲线被裁剪后参数不变，而是附带一个凸多边形的裁剪区域，只绘制区域内的像素
+# 图元的光栅化结果有三种形式：像素点 (N, 2)、填充图元的水平区段 (K, 3)、Bresenham 线段的像素段 (K, 4)，
+# 后两种写入画布时每段一次切片赋值
+from concurrent.futures import wait
+import numpy as np
+import cg_algorithms as alg
+import cg_algorithms_np as alg_np
+from cg_spatial import GridIndex
+
+
+# 平均每段的像素数不少于该值时按段切片写入，否则展开为像素点一次写入（一次切片赋值的开销约相当于30多个像素点）
+RUN_LENGTH = 32
+# 并行光栅化时每个任务的图元数
+RASTER_CHUNK = 64
+
+
+def draw_line_items(items):
+    """按算法分组，将所有线段和多边形图元的边一次性交给 alg_np.draw_lines 光栅化；
+    Bresenham 算法中平均每段不少于 RUN_LENGTH 个像素的图元（接近水平或竖直的长线段）交给 alg_np.draw_line_runs，输出像素段
+
+    :param items: (list of [item_type, p_list, algorithm, color]) 图元列表
+    :return: (dict of int: np.ndarray) 图元在 items 中的下标到其像素点坐标或像素段的映射
+    """
+    groups = {}
+    for index, (item_type, p_list, algorithm, color) in enumerate(items):
+        if item_type == 'line':
+            edges = [p_list]
+        elif item_type == 'polygon':
+            edges = [[p_list[i - 1], p_list[i]] for i in range(len(p_list))]
+        else:
+            continue
+        indices, segments, counts = groups.setdefault(algorithm, ([], [], []))
+        indices.append(index)
+        segments += edges
+        counts.append(len(edges))
+
+    result = {}
+    for algorithm, (indices, segments, counts) in groups.items():
+        if algorithm == 'Bresenham':
+            segments = np.asarray(segments, np.int64).reshape(-1, 2, 2)
+            counts = np.array(counts, np.int64)
+            long = prefer_runs(segments, counts)
+            if long.any():
+                picked = np.repeat(long, counts)
+                runs, offsets = alg_np.draw_line_runs(segments[picked])
+                split_batch(runs, offsets, [index for index, l in zip(indices, long) if l], counts[long], result)
+                segments = segments[~picked]
+                indices = [index for index, l in zip(indices, long) if not l]
+                counts = counts[~long]
+            if len(indices) == 0:
+                continue
+        pixels, offsets = alg_np.draw_lines(segments, algorithm)
+        split_batch(pixels, offsets, indices, counts, result)
+    return result
+
+
+def prefer_runs(segments, counts):
+    """Bresenham 算法绘制的图元中，哪些应输出像素段而不是像素点：平均每段不少于 RUN_LENGTH 个像素的图元
+
+    :param segments: (np.ndarray of int, shape (N, 2, 2)) 所有图元的边，按图元依次排列
+    :param counts: (np.ndarray of int) 每个图元的边数
+    :return: (np.ndarray of bool) 每个图元是否输出像素段
+    """
+    # 每条边的像素数为主轴长度 + 1，段数为副轴长度 + 1
+    bounds = np.concatenate(([0], np.cumsum(counts)))
+    d = np.abs(segments[:, 1] - segments[:, 0])
+    pixel_counts = np.diff(np.concatenate(([0], np.cumsum(d.max(axis = 1) + 1)))[bounds])
+    run_counts = np.diff(np.concatenate(([0], np.cumsum(d.min(axis = 1) + 1)))[bounds])
+    return pixel_counts >= RUN_LENGTH * run_counts
+
+
+def split_batch(pixels, offsets, indices, counts, result):
+    """将批量绘制的结果按图元切分：第 k 个图元由 counts[k] 条边组成，结果写入 result[indices[k]]"""
+    bounds = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+    for k, index in enumerate(indices):
+        result[index] = pixels[offsets[bounds[k]]:offsets[bounds[k + 1]]]
+
+
+def draw_ellipse_items(items):
+    """将所有椭圆图元一次性交给 alg_np.draw_ellipses 光栅化
+
+    :param items: (list of [item_type, p_list, algorithm, color]) 图元列表
+    :return: (dict of int: np.ndarray) 图元在 items 中的下标到其像素点坐标的映射
+    """
+    indices = [index for index, item in enumerate(items) if item[0] == 'ellipse']
+    if not indices:
+        return {}
+    pixels, offsets = alg_np.draw_ellipses([items[index][1] for index in indices])
+    return {index: pixels[offsets[k]:offsets[k + 1]] for k, index in enumerate(indices)}
+
+
+def rasterize(items):
+    """光栅化一组图元，线段、多边形和椭圆批量处理
+
+    :param items: (list of [item_type, p_list, algorithm, color]) 图元列表
+    :return: (list of np.ndarray) 与 items 一一对应的像素点坐标，填充图元为水平区段，接近水平或竖直的 Bresenham 线段为像素段
+    """
+    line_pixels = draw_line_items(items)
+    ellipse_pixels = draw_ellipse_items(items)
+    result = []
+    for index, (item_type, p_list, algorithm, color) in enumerate(items):
+        if item_type == 'line' or item_type == 'polygon':
+            pixels = line_pixels[index]
+        elif item_type == 'ellipse':
+            pixels = ellipse_pixels[index]
+        elif item_type == 'curve':
+            # 曲线的采样有大量重复，去重后再缓存和写入画布
+            pixels = alg_np.draw_curve(p_list, algorithm, unique = True)
+        elif item_type == 'filled_polygon':
+            pixels = alg_np.fill_polygon(p_list)
+        elif item_type == 'filled_ellipse':
+            pixels = alg_np.fill_ellipse(p_list)
+        result.append(pixels)
+    return result
+
+
+def is_shift_invariant(item_type, algorithm):
+    """图元整体平移 (dx, dy) 后，其像素是否也恰好整体平移 (dx, dy)
+
+    Bresenham、中点椭圆算法和扫描线填充只做整数运算，满足该性质；
+    DDA 的 round（四舍六入五成双）、Naive 与曲线的 int 截断都与坐标位置有关，不满足
+    """
+    if item_type == 'ellipse' or item_type == 'filled_polygon' or item_type == 'filled_ellipse':
+        return True
+    return (item_type == 'line' or item_type == 'polygon') and algorithm == 'Bresenham'
+
+
+def draw_items(item_dict, pixel_cache, regions = None, window = None, profiler = None, executor = None):
+    """光栅化所有图元，像素缓存以图元的类型、算法和参数为键
+
+    参数未变的图元直接复用缓存；仅发生平移且算法平移不变的图元，将缓存的像素整体平移；
+    其余图元（新建、旋转、缩放、裁剪过的）重新光栅化，线段和多边形仍一次性批量处理。
+    缓存的是裁剪区域过滤前的像素，裁剪区域在输出时才施加。
+    需要重新光栅化的图元如果包围盒与 window 不相交，则不光栅化也不缓存，像素为空
+
+    :param item_dict: (dict of str: [item_type, p_list, algorithm, color]) 图元字典
+    :param pixel_cache: (dict of str: (item_type, algorithm, np.ndarray, np.ndarray)) 图元ID到其类型、算法、参数和像素的缓存，原地更新
+    :param regions: (dict of str: np.ndarray) 图元ID到其裁剪区域的映射，没有裁剪区域的图元不在其中；省略时均没有裁剪区域
+    :param window: (tuple of int: (x_min, y_min, x_max, y_max)) 可见范围，通常为整个画布；省略时不做剔除
+    :param profiler: (cg_profile.Profiler) 给出时逐个光栅化图元并记录各自的耗时、像素数和算法，不再批量处理
+    :param executor: (concurrent.futures.Executor) 给出时（且没有 profiler）将需要光栅化的图元每 RASTER_CHUNK 个一块，在进程池中并行光栅化
+    :return: (list of (str, np.ndarray, np.ndarray)) 按绘制顺序排列的各图元ID、光栅化结果（像素点、水平区段或像素段）及颜色，被剔除的图元不在其中
+    """
+    if regions is None:
+        regions = {}
+    stale = []
+    hidden = set()
+    for item_id, (item_type, p_list, algorithm, color) in item_dict.items():
+        geometry = np.array(p_list, np.int64).reshape(-1, 2)
+        cached = pixel_cache.get(item_id)
+        if cached is not None and cached[:2] == (item_type, algorithm) and cached[2].shape == geometry.shape:
+            offset = (geometry - cached[2])[:1]
+            if not (geometry - cached[2] - offset).any():
+                if not offset.any():
+                    continue
+                if is_shift_invariant(item_type, algorithm):
+                    pixel_cache[item_id] = (item_type, algorithm, geometry, shift_pixels(cached[3], offset))
+                    continue
+        if window is not None and not intersects(item_bounds(geometry), window):
+            pixel_cache.pop(item_id, None)
+            hidden.add(item_id)
+            continue
+        stale.append((item_id, geometry))
+
+    items = [item_dict[item_id] for item_id, geometry in stale]
+    if profiler is None and executor is not None and len(items) > RASTER_CHUNK:
+        chunks = [items[i:i + RASTER_CHUNK] for i in range(0, len(items), RASTER_CHUNK)]
+        rasterized = [pixels for chunk in executor.map(rasterize, chunks) for pixels in chunk]
+    elif profiler is None:
+        rasterized = rasterize(items)
+    else:
+        rasterized = []
+        for (item_id, geometry), item in zip(stale, items):
+            with profiler.span(item_id, 'rasterize', type = item[0], algorithm = item[2]) as args:
+                rasterized.append(rasterize([item])[0])
+                args['pixels'] = pixel_count(rasterized[-1])
+    for (item_id, geometry), (item_type, p_list, algorithm, color), pixels in zip(stale, items, rasterized):
+        pixel_cache[item_id] = (item_type, algorithm, geometry, pixels)
+
+    result = []
+    for item_id, (item_type, p_list, algorithm, color) in item_dict.items():
+        if item_id in hidden:
+            continue
+        pixels = pixel_cache[item_id][3]
+        if item_id in regions:
+            pixels = mask_pixels(pixels, regions[item_id])
+        result.append((item_id, pixels, color))
+    return result
+
+
+def is_spans(pixels):
+    """光栅化结果是否为填充图元的水平区段 [y, x_start, x_end]"""
+    return pixels.shape[1] == 3
+
+
+def is_runs(pixels):
+    """光栅化结果是否为 Bresenham 线段的像素段 [x0, y0, x1, y1]"""
+    return pixels.shape[1] == 4
+
+
+def to_pixels(pixels):
+    """将任意形式的光栅化结果展开为像素点坐标"""
+    if is_spans(pixels):
+        return alg_np.span_pixels(pixels)
+    if is_runs(pixels):
+        return alg_np.run_pixels(pixels)
+    return pixels
+
+
+def pixel_count(pixels):
+    """光栅化结果覆盖的像素数"""
+    if is_spans(pixels):
+        return int((pixels[:, 2] - pixels[:, 1] + 1).sum())
+    if is_runs(pixels):
+        return int((pixels[:, 2] - pixels[:, 0] + pixels[:, 3] - pixels[:, 1] + 1).sum())
+    return len(pixels)
+
+
+def shift_pixels(pixels, offset):
+    """将像素点、水平区段或像素段整体平移
+
+    :param pixels: (np.ndarray of int32) 光栅化结果
+    :param offset: (np.ndarray of int, shape (1, 2)) 平移量 [[dx, dy]]
+    :return: (np.ndarray of int32) 平移后的结果
+    """
+    dx, dy = offset.reshape(2).tolist()
+    if is_spans(pixels):
+        return pixels + np.array([dy, dx, dx], np.int32)
+    if is_runs(pixels):
+        return pixels + np.array([dx, dy, dx, dy], np.int32)
+    return pixels + np.array([dx, dy], np.int32)
+
+
+def mask_pixels(pixels, region):
+    """只保留位于裁剪区域（凸多边形）内的像素点，水平区段则被裁剪到区域内"""
+    if is_spans(pixels):
+        return alg_np.clip_spans(pixels, region)
+    pixels = to_pixels(pixels)
+    return pixels[alg_np.in_polygon(pixels, region)]
+
+
+def write_pixels(canvas, pixels, color, height, row0 = 0, col0 = 0):
+    """将一个图元的像素写入画布或画布的一个分块：翻转y坐标，一次性去掉超出范围的像素，再一次赋值；
+    水平区段和像素段见 write_runs
+
+    :param canvas: (np.ndarray of uint8, shape (rows, cols, 3)) 画布或分块，原地修改
+    :param pixels: (np.ndarray of int, shape (N, 2)、(K, 3) 或 (K, 4)) 像素点坐标、填充图元的水平区段或线段的像素段
+    :param color: (np.ndarray of uint8, shape (3,)) 颜色
+    :param height: (int) 整个画布的高度
+    :param row0: (int) 分块第一行在画布中的行号
+    :param col0: (int) 分块第一列在画布中的列号
+    """
+    if is_spans(pixels):
+        write_runs(canvas, pixels[:, [1, 0, 2, 0]], color, height, row0, col0)
+        return
+    if is_runs(pixels):
+        write_runs(canvas, pixels, color, height, row0, col0)
+        return
+    rows = (height - 1 - row0) - pixels[:, 1]
+    cols = pixels[:, 0] - col0
+    inside = (rows >= 0) & (rows < canvas.shape[0]) & (cols >= 0) & (cols < canvas.shape[1])
+    if inside.all():
+        canvas[rows, cols] = color
+    else:
+        canvas[rows[inside], cols[inside]] = color
+
+
+def write_runs(canvas, runs, color, height, row0 = 0, col0 = 0):
+    """将水平或竖直的像素段截断到画布或分块的范围内，每段一次切片赋值；
+    平均每段不足 RUN_LENGTH 个像素时切片赋值反而更慢，展开为像素点后一次写入。参数同 write_pixels
+
+    :param runs: (np.ndarray of int, shape (K, 4)) 像素段 [x0, y0, x1, y1]
+    """
+    if len(runs) == 0:
+        return
+    lengths = (runs[:, 2] - runs[:, 0]) + (runs[:, 3] - runs[:, 1]) + 1
+    if int(lengths.sum()) < RUN_LENGTH * len(runs):
+        write_pixels(canvas, alg_np.run_pixels(runs), color, height, row0, col0)
+        return
+    # y 翻转后 y1 对应较小的行号
+    top = np.maximum((height - 1 - row0) - runs[:, 3], 0)
+    bottom = np.minimum((height - 1 - row0) - runs[:, 1], canvas.shape[0] - 1)
+    left = np.maximum(runs[:, 0] - col0, 0)
+    right = np.minimum(runs[:, 2] - col0, canvas.shape[1] - 1)
+    inside = (top <= bottom) & (left <= right)
+    for r0, r1, c0, c1 in zip(top[inside].tolist(), bottom[inside].tolist(), left[inside].tolist(), right[inside].tolist()):
+        canvas[r0:r1 + 1, c0:c1 + 1] = color
+
+
+def crop_runs(runs, rects):
+    """将水平或竖直的像素段截断到若干矩形内；矩形相互重叠时，重叠部分的像素段会重复出现
+
+    :param runs: (np.ndarray of int, shape (K, 4)) 像素段 [x0, y0, x1, y1]
+    :param rects: (np.ndarray of int, shape (R, 4)) 矩形 [x_min, y_min, x_max, y_max]
+    :return: (np.ndarray of int64, shape (M, 4)) 各矩形内的像素段
+    """
+    low = np.maximum(runs[:, None, :2], rects[None, :, :2])
+    high = np.minimum(runs[:, None, 2:], rects[None, :, 2:])
+    keep = (low <= high).all(axis = 2)
+    return np.concatenate((low[keep], high[keep]), axis = 1)
+
+
+def pixel_bounds(pixels):
+    """像素点、水平区段或像素段的包围盒 (x_min, y_min, x_max, y_max)，没有像素时返回 None"""
+    if len(pixels) == 0:
+        return None
+    if is_spans(pixels):
+        y_min, x_min = pixels[:, :2].min(axis = 0).tolist()
+        y_max, x_max = pixels[:, [0, 2]].max(axis = 0).tolist()
+        return x_min, y_min, x_max, y_max
+    if is_runs(pixels):
+        x_min, y_min = pixels[:, :2].min(axis = 0).tolist()
+        x_max, y_max = pixels[:, 2:].max(axis = 0).tolist()
+        return x_min, y_min, x_max, y_max
+    x_min, y_min = pixels.min(axis = 0).tolist()
+    x_max, y_max = pixels.max(axis = 0).tolist()
+    return x_min, y_min, x_max, y_max
+
+
+class PersistentCanvas:
+    """
+    跨多次保存保留的画布，记录每个图元上次绘制的像素及其包围盒。
+    图元被新建、修改后用 mark 标记，被删除时调用 remove；render 只重绘这些图元新旧包围盒覆盖的区域：
+    先将区域填为白色，再按绘制顺序将与区域相交的每个图元在区域内的部分写入一次，其余区域保持不变。
+    脏图元或与区域相交的图元超过一半时整幅重绘。
+    画布有两个缓冲区：render 返回的缓冲区用 release 移交出去后不再修改，下次局部重绘前换用另一个缓冲区，
+    只从移交出去的缓冲区拷贝另一个缓冲区缺少的矩形区域，不拷贝整个画布
+    """
+    def __init__(self, cell_size = 64):
+        self.canvas = None
+        self.released = None                # canvas 移交出去时为其使用完毕的 Future，未移交时为 None
+        self.spare = None                   # 另一个缓冲区
+        self.spare_busy = None              # spare 上次移交时的 Future
+        self.stale = None                   # spare 比 canvas 缺少的矩形区域，None 表示整个画布
+        self.drawn = {}                     # 图元ID -> (像素, 颜色)，上次写入画布的内容
+        self.index = GridIndex(cell_size)   # 上次写入画布的像素的包围盒
+        self.order = {}                     # 图元ID -> 绘制顺序
+        self.next_order = 0
+        self.indexed = True                 # index 是否与 drawn 一致
+        self.dirty = set()                  # 新建或修改过的图元ID
+        self.damage = []                    # 已删除图元的包围盒
+
+    def reset(self):
+        """丢弃画布，下次 render 时整幅重绘"""
+        self.canvas = None
+        self.released = None
+        self.spare = None
+        self.spare_busy = None
+        self.stale = None
+        self.drawn = {}
+        self.index.clear()
+        self.indexed = True
+        self.order = {}
+        self.next_order = 0
+        self.dirty = set()
+        self.damage = []
+
+    def mark(self, item_id):
+        """标记新建或修改过的图元；新图元排在已有图元之后绘制，与图元字典的插入顺序一致"""
+        if item_id not in self.order:
+            self.order[item_id] = self.next_order
+            self.next_order += 1
+        self.dirty.add(item_id)
+
+    def remove(self, item_id):
+        """删除图元，其上次绘制的区域在下次 render 时重绘"""
+        drawn = self.drawn.pop(item_id, None)
+        bounds = None if drawn is None else pixel_bounds(drawn[0])
+        if bounds is not None:
+            self.damage.append(bounds)
+        self.index.remove(item_id)
+        self.order.pop(item_id, None)
+        self.dirty.discard(item_id)
+
+    def store(self, item_id, pixels, color):
+        """记录图元写入画布的内容，返回其包围盒"""
+        self.drawn[item_id] = (pixels, color)
+        bounds = pixel_bounds(pixels)
+        if bounds is None:
+            self.index.remove(item_id)
+        else:
+            self.index.update(item_id, bounds)
+        return bounds
+
+    def render(self, item_dict, pixel_cache, width, height, regions = None, profiler = None):
+        """将图元的改动更新到画布上
+
+        :param item_dict: (dict) 图元字典，按绘制顺序排列
+        :param pixel_cache: (dict) 图元ID到像素的缓存，见 draw_items
+        :param width: (int) 画布宽度
+        :param height: (int) 画布高度
+        :param regions: (dict of str: np.ndarray) 图元ID到裁剪区域的字典
+        :param profiler: (cg_profile.Profiler) 性能记录，为 None 时不记录
+        :return: (np.ndarray of uint8, shape (height, width, 3)) 画布，下次 render 时会被原地修改
+        """
+        window = (0, 0, width - 1, height - 1)
+        if self.canvas is None or self.canvas.shape[:2] != (height, width) or len(self.dirty) + len(self.damage) > len(item_dict) // 2:
+            self.repaint_all(item_dict, pixel_cache, height, regions, window, profiler)
+        else:
+            if not self.indexed:
+                for item_id, (pixels, color) in self.drawn.items():
+                    self.store(item_id, pixels, color)
+                self.indexed = True
+            rects = self.damage
+            for item_id in self.dirty:
+                bounds = self.index.bounds.get(item_id)
+                if bounds is not None:
+                    rects.append(bounds)
+                self.index.remove(item_id)
+                self.drawn.pop(item_id, None)
+            changed = {item_id: item_dict[item_id] for item_id in self.dirty}
+            for item_id, pixels, color in draw_items(changed, pixel_cache, regions, window, profiler):
+                bounds = self.store(item_id, pixels, color)
+                if bounds is not None:
+                    rects.append(bounds)
+            rects = [(max(x_min, 0), max(y_min, 0), min(x_max, width - 1), min(y_max, height - 1)) for x_min, y_min, x_max, y_max in rects]
+            rects = [rect for rect in rects if rect[0] <= rect[2] and rect[1] <= rect[3]]
+            candidates = set()
+            for rect in rects:
+                candidates.update(self.index.query_rect(*rect))
+            if len(candidates) > len(self.drawn) // 2:
+                # 受影响的图元太多时，整幅重绘更快
+                self.repaint_all(item_dict, pixel_cache, height, regions, window, profiler)
+            elif rects:
+                self.swap(height)
+                self.repaint(rects, candidates, height)
+                if self.stale is not None:
+                    self.stale += rects
+        self.dirty = set()
+        self.damage = []
+        return self.canvas
+
+    def release(self, future):
+        """将 render 返回的画布移交出去，此后不再修改它，直到 future 完成
+
+        :param future: (concurrent.futures.Future) 画布使用完毕时完成，如 cg_pipeline.ImageWriter.submit 的返回值
+        """
+        self.released = future
+
+    def swap(self, height):
+        """画布已移交时换用另一个缓冲区，等它上次的移交结束后，从当前画布拷贝它缺少的区域"""
+        if self.released is None:
+            return
+        canvas = self.canvas
+        if self.spare is None or self.spare.shape != canvas.shape:
+            self.spare = np.empty_like(canvas)
+            self.stale = None
+        elif self.spare_busy is not None:
+            # 只等待使用完毕，出错时由移交的一方报告
+            wait([self.spare_busy])
+        if self.stale is None:
+            self.spare[...] = canvas
+        else:
+            for x_min, y_min, x_max, y_max in self.stale:
+                self.spare[height - 1 - y_max:height - y_min, x_min:x_max + 1] = canvas[height - 1 - y_max:height - y_min, x_min:x_max + 1]
+        self.canvas, self.spare = self.spare, canvas
+        self.spare_busy, self.released = self.released, None
+        self.stale = []
+
+    def repaint_all(self, item_dict, pixel_cache, height, regions, window, profiler):
+        """整幅重绘到新的缓冲区，原来的缓冲区已移交时留作另一个缓冲区"""
+        if self.released is not None:
+            self.spare, self.spare_busy, self.released = self.canvas, self.released, None
+        self.stale = None
+        self.canvas = np.full((height, window[2] + 1, 3), 255, np.uint8)
+        self.drawn = {}
+        self.index.clear()
+        for item_id, pixels, color in draw_items(item_dict, pixel_cache, regions, window, profiler):
+            write_pixels(self.canvas, pixels, color, height)
+            self.drawn[item_id] = (pixels, color)
+        self.order = {item_id: i for i, item_id in enumerate(item_dict)}
+        self.next_order = len(self.order)
+        # 只保存一次的脚本用不到索引，第一次局部重绘时才建立
+        self.indexed = False
+
+    def repaint(self, rects, candidates, height):
+        """重绘若干矩形区域：区域内先涂白，再按绘制顺序将与之相交的图元写入区域内的部分，每个图元只写一次。
+        水平区段和像素段被截断到各矩形内后按段写入；像素点用区域的掩码过滤，不会覆盖区域外的像素
+
+        :param rects: (list of tuple of int: (x_min, y_min, x_max, y_max)) 画布范围内的矩形
+        :param candidates: (set of str) 包围盒与某个矩形相交的图元ID
+        :param height: (int) 画布高度
+        """
+        # 掩码只覆盖所有矩形的并集包围盒
+        x_min = min(rect[0] for rect in rects)
+        y_min = min(rect[1] for rect in rects)
+        x_max = max(rect[2] for rect in rects)
+        y_max = max(rect[3] for rect in rects)
+        row0, col0 = height - 1 - y_max, x_min
+        view = self.canvas[row0:height - y_min, col0:x_max + 1]
+        damaged = np.zeros(view.shape[:2], bool)
+        for rx_min, ry_min, rx_max, ry_max in rects:
+            damaged[y_max - ry_max:y_max - ry_min + 1, rx_min - x_min:rx_max - x_min + 1] = True
+        view[damaged] = 255
+        rects = np.array(rects, np.int64)
+        for item_id in sorted(candidates, key = self.order.__getitem__):
+            pixels, color = self.drawn[item_id]
+            if is_spans(pixels) or is_runs(pixels):
+                # 只用与图元包围盒相交的矩形截断，不展开整个图元
+                bx_min, by_min, bx_max, by_max = self.index.bounds[item_id]
+                near = rects[(rects[:, 0] <= bx_max) & (rects[:, 2] >= bx_min) & (rects[:, 1] <= by_max) & (rects[:, 3] >= by_min)]
+                runs = pixels[:, [1, 0, 2, 0]] if is_spans(pixels) else pixels
+                write_runs(view, crop_runs(runs, near), color, height, row0, col0)
+                continue
+            rows = y_max - pixels[:, 1]
+            cols = pixels[:, 0] - x_min
+            inside = (rows >= 0) & (rows < view.shape[0]) & (cols >= 0) & (cols < view.shape[1])
+            rows, cols = rows[inside], cols[inside]
+            keep = damaged[rows, cols]
+            view[rows[keep], cols[keep]] = color
+
+
+def item_bounds(p_list):
+    """图元像素的包围盒
+
+    四种图元的像素都不超出其参数点的包围盒（曲线满足凸包性质，椭圆参数即为包围框），
+    这里再向外扩展一个像素作为保守估计
+
+    :param p_list: (list of list of int) 图元参数
+    :return: (tuple of int: (x_min, y_min, x_max, y_max)) 包围盒，参数为空时返回 None
+    """
+    if len(p_list) == 0:
+        return None
+    p = np.asarray(p_list, np.int64).reshape(-1, 2)
+    x_min, y_min = p.min(axis=0) - 1
+    x_max, y_max = p.max(axis=0) + 1
+    return int(x_min), int(y_min), int(x_max), int(y_max)
+
+
+def intersects(bounds, window):
+    """判断包围盒与矩形是否相交，包围盒为 None（图元参数为空）时不相交
+
+    :param bounds: (tuple of int: (x_min, y_min, x_max, y_max)) 包围盒
+    :param window: (tuple of int: (x_min, y_min, x_max, y_max)) 矩形
+    :return: (bool) 是否相交
+    """
+    if bounds is None:
+        return False
+    x_min, y_min, x_max, y_max = window
+    bx_min, by_min, bx_max, by_max = bounds
+    return bx_min <= x_max and x_min <= bx_max and by_min <= y_max and y_min <= by_max
+
+
+def clip_item(item_type, p_list, region, x0, y0, x1, y1, algorithm):
+    """用矩形窗口裁剪任意类型的图元
+
+    包围盒与窗口不相交的图元直接丢弃，包围盒位于窗口内的图元（包括线段）保持不变；
+    线段使用 algorithm 指定的线段裁剪算法，多边形（包括填充的多边形）使用 Sutherland-Hodgman 算法裁剪顶点；
+    椭圆（包括填充的椭圆）和曲线的参数不变，其裁剪区域（初始为整个窗口）用 Sutherland-Hodgman 算法与窗口求交
+
+    :param item_type: (string) 图元类型
+    :param p_list: (list of list of int) 图元参数
+    :param region: (np.ndarray) 图元当前的裁剪区域，没有时为 None
+    :param x0: (int) 裁剪窗口一角的x坐标
+    :param y0: (int) 裁剪窗口一角的y坐标
+    :param x1: (int) 裁剪窗口对角的x坐标
+    :param y1: (int) 裁剪窗口对角的y坐标
+    :param algorithm: (string) 线段裁剪算法，'Cohen-Sutherland'或'Liang-Barsky'
+    :return: (tuple: (list of list of int, np.ndarray)) 裁剪后的参数和裁剪区域，图元完全位于窗口外时返回 None
+    """
+    bounds = item_bounds(p_list)
+    x_min, x_max = min(x0, x1), max(x0, x1)
+    y_min, y_max = min(y0, y1), max(y0, y1)
+    if not intersects(bounds, (x_min, y_min, x_max, y_max)):
+        return None
+    bx_min, by_min, bx_max, by_max = bounds
+    if x_min <= bx_min and bx_max <= x_max and y_min <= by_min and by_max <= y_max:
+        return p_list, region
+    if item_type == 'line':
+        if p_list[0][0] == p_list[1][0] and p_list[0][1] == p_list[1][1]:
+            # 退化为一点的线段：包围盒就是该点，上面已经判断过它是否位于窗口内；Liang-Barsky 对它会除以零
+            return None
+        clipped = alg.clip(p_list, x_min, y_min, x_max, y_max, algorithm)
+        if clipped is None:
+            # Cohen-Sutherland 对贴近窗口边界的线段可能四轮之后仍未得出结果，改用 Liang-Barsky
+            clipped = alg.clip(p_list, x_min, y_min, x_max, y_max, 'Liang-Barsky')
+        return (clipped, None) if clipped else None
+    if item_type == 'polygon' or item_type == 'filled_polygon':
+        p_list = alg_np.clip_polygon(p_list, x_min, y_min, x_max, y_max)
+        return (p_list.tolist(), None) if len(p_list) > 0 else None
+    if region is None:
+        region = [[x_min, y_min], [x_max, y_min], [x_max, y_max], [x_min, y_max]]
+    region = alg_np.clip_polygon(region, x_min, y_min, x_max, y_max)
+    return (p_list, region) if len(region) > 0 else None
+
+
+def split_tiles(pixels, width, height, tile_size):
+    """将一个图元的光栅化结果按分块切分，超出画布的部分被丢弃
+
+    :param pixels: (np.ndarray of int) 像素点坐标、水平区段或像素段
+    :param width: (int) 画布宽度
+    :param height: (int) 画布高度
+    :param tile_size: (int) 分块边长
+    :return: (list of (int, np.ndarray)) 分块编号（按行优先）及该分块内的部分；水平区段被转换为像素段
+    """
+    cols = (width + tile_size - 1) // tile_size
+    if len(pixels) == 0:
+        return []
+    if is_spans(pixels) or is_runs(pixels):
+        runs = pixels[:, [1, 0, 2, 0]] if is_spans(pixels) else pixels
+        x_min, y_min, x_max, y_max = pixel_bounds(pixels)
+        r0 = max(height - 1 - y_max, 0) // tile_size
+        r1 = min(height - 1 - y_min, height - 1) // tile_size
+        c0 = max(x_min, 0) // tile_size
+        c1 = min(x_max, width - 1) // tile_size
+        result = []
+        for r in range(r0, r1 + 1):
+            for c in range(c0, c1 + 1):
+                # 分块的行范围 [r * tile_size, (r + 1) * tile_size) 对应的 y 范围
+                rect = np.array([[c * tile_size, height - (r + 1) * tile_size, (c + 1) * tile_size - 1, height - 1 - r * tile_size]])
+                piece = crop_runs(runs, rect)
+                if len(piece):
+                    result.append((r * cols + c, piece))
+        return result
+    rows = height - 1 - pixels[:, 1]
+    inside = (rows >= 0) & (rows < height) & (pixels[:, 0] >= 0) & (pixels[:, 0] < width)
+    pixels, rows = pixels[inside], rows[inside]
+    if len(pixels) == 0:
+        return []
+    tiles = rows // tile_size * cols + pixels[:, 0] // tile_size
+    first = int(tiles[0])
+    if (tiles == first).all():
+        return [(first, pixels)]
+    order = np.argsort(tiles, kind = 'stable')
+    names, counts = np.unique(tiles[order], return_counts = True)
+    return list(zip(names.tolist(), np.split(pixels[order], np.cumsum(counts)[:-1])))
+
+
+def render_tile(bounds, pieces, height):
+    """在一个分块中按顺序写入各图元落在该分块内的像素，在工作进程中执行
+
+    :param bounds: (tuple of int: (row0, row1, col0, col1)) 分块在画布中的行列范围（左闭右开）
+    :param pieces: (list of (np.ndarray, np.ndarray)) 按绘制顺序排列的各图元在该分块内的像素点或像素段及其颜色
+    :param height: (int) 画布高度
+    :return: (np.ndarray of uint8, shape (row1 - row0, col1 - col0, 3)) 分块图像
+    """
+    row0, row1, col0, col1 = bounds
+    tile = np.zeros([row1 - row0, col1 - col0, 3], np.uint8)
+    tile.fill(255)
+    for pixels, color in pieces:
+        write_pixels(tile, pixels, color, height, row0, col0)
+    return tile
+
+
+def compose_tiled(drawn, width, height, tile_size, executor, tile_cache = None):
+    """分块并行合成画布
+
+    图元先由 draw_items 光栅化（每个图元只光栅化一次，并利用像素缓存），其结果按分块切分；
+    各分块在工作进程中按原顺序写入落在其中的像素，后绘制的图元仍覆盖先绘制的图元。
+    画布内的像素与逐个图元串行绘制的结果完全相同，超出画布的像素被丢弃
+
+    :param drawn: (list of (str, np.ndarray, np.ndarray)) draw_items 的结果：按绘制顺序排列的图元ID、光栅化结果及颜色
+    :param width: (int) 画布宽度
+    :param height: (int) 画布高度
+    :param tile_size: (int) 分块边长
+    :param executor: (concurrent.futures.Executor) 执行分块任务的进程池
+    :param tile_cache: (dict of str: (np.ndarray, tuple, list)) 图元ID到其光栅化结果、画布布局和切分结果的缓存，原地更新；
+                       光栅化结果未变（仍是同一个数组）的图元不再重新切分
+    :return: (np.ndarray of uint8, shape (height, width, 3)) 画布
+    """
+    rows = (height + tile_size - 1) // tile_size
+    cols = (width + tile_size - 1) // tile_size
+    layout = (width, height, tile_size)
+    cache = {}
+    tiles = [[] for i in range(rows * cols)]
+    for item_id, pixels, color in drawn:
+        cached = None if tile_cache is None else tile_cache.get(item_id)
+        if cached is not None and cached[0] is pixels and cached[1] == layout:
+            split = cached[2]
+        else:
+            split = split_tiles(pixels, width, height, tile_size)
+        cache[item_id] = (pixels, layout, split)
+        for tile, piece in split:
+            tiles[tile].append((piece, color))
+    if tile_cache is not None:
+        # 只保留本次绘制的图元，已删除的图元不再占用缓存
+        tile_cache.clear()
+        tile_cache.update(cache)
+
+    canvas = np.zeros([height, width, 3], np.uint8)
+    canvas.fill(255)
+    futures = []
+    for r in range(rows):
+        for c in range(cols):
+            pieces = tiles[r * cols + c]
+            if pieces:
+                bounds = (r * tile_size, min((r + 1) * tile_size, height), c * tile_size, min((c + 1) * tile_size, width))
+                futures.append((bounds, executor.submit(render_tile, bounds, pieces, height)))
+    for (row0, row1, col0, col1), future in futures:
+        canvas[row0:row1, col0:col1] = future.result()
+    return canvas
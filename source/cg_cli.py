@@ -3,110 +3,328 @@
 
 import sys
 import os
-import cg_algorithms as alg
+import glob
+import argparse
+from contextlib import nullcontext, closing
+from concurrent.futures import ProcessPoolExecutor
+import cg_algorithms_np as alg_np
+from cg_parser import parse_commands, ParseError
+from cg_canvas import PersistentCanvas, draw_items, compose_tiled, clip_item
+from cg_profile import Profiler
+import cg_snapshot
+from cg_pipeline import prefetch, ImageWriter
 import numpy as np
-from PIL import Image
 
 
-if __name__ == '__main__':
-    input_file = sys.argv[1]
-    output_dir = sys.argv[2]
+class Scene:
+    """绘图脚本的执行状态：画布大小、画笔颜色、图元字典及其像素缓存
+
+    每条指令对应一个方法，由 HANDLERS 按指令名分派；坐标参数均为脚本中的原始坐标。
+    tile_size 大于0时，saveCanvas 由 workers 个进程并行光栅化图元（每个图元一次，结果同样缓存），再将画布分块并行写入。
+
+    平移、旋转、缩放不立即修改图元参数，而是累积到图元的 3×3 仿射变换矩阵上，
+    直到光栅化或裁剪时才对绘制（或上次裁剪）时的参数施加一次并截断为整数。
+    被裁剪过的椭圆和曲线带有裁剪区域，变换同样作用于裁剪区域的顶点。
+
+    给出 profiler 时记录每条指令、每个光栅化的图元以及写入画布和编码图像的耗时。
+
+    不分块时画布在多次 saveCanvas 之间保留，新建、变换、裁剪、删除图元时标记其为脏，
+    保存时只重绘受影响的区域，代价与改动量而不是图元总数成正比。
+
+    saveCanvas 合成画布后直接（不拷贝）将其交给 encoders 个后台线程编码并保存，不等待写入完成，
+    close 时等待所有图像写完
+    """
+    def __init__(self, output_dir, tile_size = 0, workers = None, profiler = None, encoders = 2):
+        self.output_dir = output_dir
+        self.item_dict = {}
+        self.pixel_cache = {}
+        self.transforms = {}        # 图元ID -> [变换前的参数, 变换前的裁剪区域, 累积的变换]
+        self.unresolved = set()     # 变换矩阵改变后尚未更新参数的图元ID
+        self.regions = {}           # 图元ID -> 裁剪区域（凸多边形顶点），只有裁剪过的椭圆和曲线才有
+        self.canvas = PersistentCanvas()
+        self.tile_cache = {}        # 分块合成时各图元按分块切分的结果，见 compose_tiled
+        self.pen_color = np.zeros(3, np.uint8)
+        self.width = 0
+        self.height = 0
+        self.tile_size = tile_size
+        self.workers = workers
+        self.executor = None
+        self.profiler = profiler
+        self.writer = ImageWriter(encoders, profiler = profiler)
+
+    def execute(self, command):
+        if self.profiler is None:
+            self.HANDLERS[command.name](self, *command.args)
+            return
+        args = {'line': command.lineno}
+        if command.args:
+            args['arg'] = str(command.args[0])
+        with self.profiler.span(command.name, 'command', **args):
+            self.HANDLERS[command.name](self, *command.args)
+
+    def close(self):
+        try:
+            self.writer.close()
+        finally:
+            if self.executor is not None:
+                self.executor.shutdown()
+                self.executor = None
+
+    def reset_canvas(self, width, height):
+        self.width = width
+        self.height = height
+        self.item_dict = {}
+        self.pixel_cache = {}
+        self.transforms = {}
+        self.unresolved = set()
+        self.regions = {}
+        self.canvas.reset()
+        self.tile_cache = {}
+
+    def resolve(self, item_ids):
+        """对图元施加累积的变换矩阵，更新其参数"""
+        for item_id in item_ids:
+            base, base_region, transform = self.transforms[item_id]
+            self.item_dict[item_id][1] = alg_np.apply_transform(base, transform).tolist()
+            if base_region is not None:
+                self.regions[item_id] = alg_np.apply_transform(base_region, transform)
+        self.unresolved.difference_update(item_ids)
+
+    def save_canvas(self, save_name):
+        self.resolve(list(self.unresolved))
+        height = self.height
+        if self.tile_size > 0:
+            if self.executor is None:
+                self.executor = ProcessPoolExecutor(max_workers = self.workers)
+            window = (0, 0, self.width - 1, height - 1)
+            # 图元在进程池中分块光栅化并缓存，再按分块并行写入；有 profiler 时改为逐个图元光栅化并记录
+            drawn = draw_items(self.item_dict, self.pixel_cache, self.regions, window, self.profiler, self.executor)
+            with self.span(save_name, 'compose'):
+                canvas = compose_tiled(drawn, self.width, height, self.tile_size, self.executor, self.tile_cache)
+            # 分块合成每次都使用新的画布，不维护持久画布
+            self.canvas.reset()
+        else:
+            with self.span(save_name, 'write'):
+                canvas = self.canvas.render(self.item_dict, self.pixel_cache, self.width, height, self.regions, self.profiler)
+
+        future = self.writer.submit(canvas, os.path.join(self.output_dir, save_name + '.bmp'), save_name)
+        if self.tile_size == 0:
+            # 持久画布不拷贝，写完之前不再修改移交出去的缓冲区
+            self.canvas.release(future)
+
+    def span(self, name, category):
+        """有 profiler 时记录耗时区间，否则什么也不做"""
+        if self.profiler is None:
+            return nullcontext({})
+        return self.profiler.span(name, category)
+
+    def set_color(self, r, g, b):
+        self.pen_color[0] = r
+        self.pen_color[1] = g
+        self.pen_color[2] = b
+
+    def flip(self, p_list):
+        return [[x, self.height - 1 - y] for x, y in p_list]
+
+    def add_item(self, item_id, item):
+        self.item_dict[item_id] = item
+        self.transforms.pop(item_id, None)
+        self.unresolved.discard(item_id)
+        self.regions.pop(item_id, None)
+        self.canvas.mark(item_id)
+
+    def draw_line(self, item_id, x0, y0, x1, y1, algorithm):
+        self.add_item(item_id, ['line', self.flip([[x0, y0], [x1, y1]]), algorithm, np.array(self.pen_color)])
+
+    def draw_polygon(self, item_id, p_list, algorithm):
+        self.add_item(item_id, ['polygon', self.flip(p_list), algorithm, np.array(self.pen_color)])
+
+    def draw_ellipse(self, item_id, x0, y0, x1, y1):
+        self.add_item(item_id, ['ellipse', self.flip([[x0, y0], [x1, y1]]), 0, np.array(self.pen_color)])
+
+    def draw_curve(self, item_id, p_list, algorithm):
+        self.add_item(item_id, ['curve', self.flip(p_list), algorithm, np.array(self.pen_color)])
+
+    def fill_polygon(self, item_id, p_list):
+        self.add_item(item_id, ['filled_polygon', self.flip(p_list), 'scanline', np.array(self.pen_color)])
+
+    def fill_ellipse(self, item_id, x0, y0, x1, y1):
+        self.add_item(item_id, ['filled_ellipse', self.flip([[x0, y0], [x1, y1]]), 'scanline', np.array(self.pen_color)])
+
+    def transform(self, item_id, transform):
+        """将变换累积到图元的变换上，只做一次 3×3 矩阵乘法"""
+        if item_id not in self.item_dict:
+            raise KeyError(item_id)
+        if item_id in self.transforms:
+            self.transforms[item_id][2] = alg_np.compose_transform(transform, self.transforms[item_id][2])
+        else:
+            self.transforms[item_id] = [self.item_dict[item_id][1], self.regions.get(item_id), transform]
+        self.unresolved.add(item_id)
+        self.canvas.mark(item_id)
+
+    def translate(self, item_id, dx, dy):
+        self.transform(item_id, alg_np.translate_transform(dx, -dy))
+
+    def rotate(self, item_id, xc, yc, angle):
+        self.transform(item_id, alg_np.rotate_transform(xc, self.height - 1 - yc, angle))
+
+    def scale(self, item_id, xc, yc, s):
+        self.transform(item_id, alg_np.scale_transform(xc, self.height - 1 - yc, s))
+
+    def clip(self, item_id, x0, y0, x1, y1, algorithm):
+        if item_id in self.unresolved:
+            self.resolve([item_id])
+        # 裁剪后的参数成为之后变换的起点
+        self.transforms.pop(item_id, None)
+        item = self.item_dict[item_id]
+        (x0, y0), (x1, y1) = self.flip([[x0, y0], [x1, y1]])
+        result = clip_item(item[0], item[1], self.regions.get(item_id), x0, y0, x1, y1, algorithm)
+        if result is None:
+            self.item_dict.pop(item_id)
+            self.pixel_cache.pop(item_id, None)
+            self.regions.pop(item_id, None)
+            self.canvas.remove(item_id)
+            return
+        self.canvas.mark(item_id)
+        item[1], region = result
+        if region is None:
+            self.regions.pop(item_id, None)
+        else:
+            self.regions[item_id] = region
+
+    HANDLERS = {
+        'resetCanvas': reset_canvas,
+        'saveCanvas': save_canvas,
+        'setColor': set_color,
+        'drawLine': draw_line,
+        'drawPolygon': draw_polygon,
+        'drawEllipse': draw_ellipse,
+        'drawCurve': draw_curve,
+        'fillPolygon': fill_polygon,
+        'fillEllipse': fill_ellipse,
+        'translate': translate,
+        'rotate': rotate,
+        'scale': scale,
+        'clip': clip,
+    }
+
+
+def run(input_file, output_dir, tile_size = 0, workers = None, profiler = None,
+        checkpoint = None, checkpoint_every = 10000, resume_from = None, encoders = 2):
+    """执行一个绘图脚本，saveCanvas 的结果保存在 output_dir 中
+
+    :param input_file: (string) 脚本路径
+    :param output_dir: (string) 输出目录
+    :param tile_size: (int) 分块合成画布时的分块边长，0表示串行绘制
+    :param workers: (int) 分块合成的进程数，默认为 CPU 核数
+    :param profiler: (cg_profile.Profiler) 给出时记录解析、执行各条指令及保存画布各阶段的耗时
+    :param checkpoint: (string) 给出时每执行 checkpoint_every 条指令将场景快照保存到该路径
+    :param checkpoint_every: (int) 保存快照的间隔（指令数）
+    :param resume_from: (string) 给出时先从该快照恢复场景，再从快照记录的下一行继续执行
+    :param encoders: (int) 编码并保存图像的后台线程数
+    """
     os.makedirs(output_dir, exist_ok = True)
+    scene = Scene(output_dir, tile_size, workers, profiler, encoders)
+    try:
+        first_line = 1
+        if resume_from is not None:
+            first_line = cg_snapshot.load(resume_from, scene) + 1
+        with open(input_file, 'r') as fp:
+            # 解析在后台线程中进行，与执行指令重叠
+            commands = parse_commands(fp, first_line)
+            if profiler is not None:
+                commands = profiler.iterate(commands, 'parse', 'parse')
+            with closing(prefetch(commands)) as commands:
+                for count, command in enumerate(commands, 1):
+                    scene.execute(command)
+                    if checkpoint is not None and count % checkpoint_every == 0:
+                        # 快照之前的 saveCanvas 必须已经写入文件，续跑时才不会丢失
+                        scene.writer.flush()
+                        with scene.span(checkpoint, 'checkpoint'):
+                            cg_snapshot.save(checkpoint, scene, command.lineno)
+    finally:
+        scene.close()
+
+
+def batch_outputs(patterns, output_dir):
+    """展开脚本路径中的通配符，并为每个脚本分配输出目录 output_dir/<脚本名>
+
+    脚本按路径排序，重名的脚本依次加上 _2、_3 等后缀，保证同样的输入总是得到同样的输出目录
+
+    :param patterns: (list of string) 脚本路径或通配符
+    :param output_dir: (string) 输出根目录
+    :return: (list of (string, string)) 脚本路径及其输出目录
+    """
+    inputs = set()
+    for pattern in patterns:
+        inputs.update(glob.glob(pattern) if glob.has_magic(pattern) else [pattern])
+    result = []
+    used = set()
+    suffixes = {}   # 脚本名 -> 上次尝试的后缀，重名很多时不必每次从 _2 开始尝试
+    for path in sorted(inputs):
+        stem = os.path.splitext(os.path.basename(path))[0]
+        name = stem
+        suffix = suffixes.get(stem, 1)
+        while name in used:
+            suffix += 1
+            name = '%s_%d' % (stem, suffix)
+        suffixes[stem] = suffix
+        used.add(name)
+        result.append((path, os.path.join(output_dir, name)))
+    return result
 
-    item_dict = {}
-    pen_color = np.zeros(3, np.uint8)
-    width = 0
-    height = 0
-
-    with open(input_file, 'r') as fp:
-        line = fp.readline()
-        while line:
-            line = line.strip().split(' ')
-            if line[0] == 'resetCanvas':
-                width = int(line[1])
-                height = int(line[2])
-                item_dict = {}
-            elif line[0] == 'saveCanvas':
-                save_name = line[1]
-                canvas = np.zeros([height, width, 3], np.uint8)
-                canvas.fill(255)
-                for item_type, p_list, algorithm, color in item_dict.values():
-                    if item_type == 'line':
-                        pixels = alg.draw_line(p_list, algorithm)
-                    elif item_type == 'polygon':
-                        pixels = alg.draw_polygon(p_list, algorithm)
-                    elif item_type == 'ellipse':
-                        pixels = alg.draw_ellipse(p_list)
-                    elif item_type == 'curve':
-                        pixels = alg.draw_curve(p_list, algorithm)
-                    for x, y in pixels:
-                        canvas[height - 1 - y, x] = color
-
-                Image.fromarray(canvas).save(os.path.join(output_dir, save_name + '.bmp'), 'bmp')
-            elif line[0] == 'setColor':
-                pen_color[0] = int(line[1])
-                pen_color[1] = int(line[2])
-                pen_color[2] = int(line[3])
-            elif line[0] == 'drawLine':
-                item_id = line[1]
-                x0 = int(line[2])
-                y0 = height - 1 - int(line[3])
-                x1 = int(line[4])
-                y1 = height - 1 - int(line[5])
-                algorithm = line[6]
-                item_dict[item_id] = ['line', [[x0, y0], [x1, y1]], algorithm, np.array(pen_color)]
-            elif line[0] == 'drawPolygon':
-                item_id = line[1]
-                p_list = []
-                for i in range(2, len(line) - 1, 2):
-                    p_list.append([int(line[i]), height - 1 - int(line[i + 1])])
-                algorithm = line[len(line) - 1]
-                item_dict[item_id] = ['polygon', p_list, algorithm, np.array(pen_color)]
-            elif line[0] == 'drawEllipse':
-                item_id = line[1]
-                x0 = int(line[2])
-                y0 = height - 1 - int(line[3])
-                x1 = int(line[4])
-                y1 = height - 1 - int(line[5])
-                item_dict[item_id] = ['ellipse', [[x0, y0], [x1, y1]], 0, np.array(pen_color)]
-            elif line[0] == 'translate':
-                item_id = line[1]
-                dx = int(line[2])
-                dy = -int(line[3])
-                p_list = item_dict[item_id][1].copy()
-                item_dict[item_id][1] = alg.translate(p_list, dx, dy)
-            elif line[0] == 'rotate':
-                item_id = line[1]
-                xc = int(line[2])
-                yc = height - 1 - int(line[3])
-                angle = int(line[4])
-                p_list = item_dict[item_id][1].copy()
-                item_dict[item_id][1] = alg.rotate(p_list, xc, yc, angle)
-            elif line[0] == 'scale':
-                item_id = line[1]
-                xc = int(line[2])
-                yc = height - 1 - int(line[3])
-                s = float(line[4])
-                p_list = item_dict[item_id][1].copy()
-                item_dict[item_id][1] = alg.scale(p_list, xc, yc, s)
-            elif line[0] == 'clip':
-                item_id = line[1]
-                x0 = int(line[2])
-                y0 = height - 1 - int(line[3])
-                x1 = int(line[4])
-                y1 = height - 1 - int(line[5])
-                algorithm = line[6]
-                p_list = item_dict[item_id][1].copy()
-                item_dict[item_id][1] = alg.clip(p_list, x0, y0, x1, y1, algorithm)
-                if len(item_dict[item_id][1]) == 0:
-                    item_dict.pop(item_id)
-            elif line[0] == 'drawCurve':
-                item_id = line[1]
-                p_list = []
-                for i in range(2, len(line) - 1, 2):
-                    p_list.append([int(line[i]), height - 1 - int(line[i + 1])])
-                algorithm = line[len(line) - 1]
-                item_dict[item_id] = ['curve', p_list, algorithm, np.array(pen_color)]
-
-            line = fp.readline()
 
+def run_batch(jobs, workers = None, encoders = 2):
+    """用进程池并行执行多个脚本，单个脚本出错不影响其余脚本
+
+    :param jobs: (list of (string, string)) 脚本路径及其输出目录
+    :param workers: (int) 进程数，默认为 CPU 核数
+    :param encoders: (int) 每个脚本编码并保存图像的后台线程数
+    :return: (list of (string, string)) 出错的脚本路径及错误信息
+    """
+    failures = []
+    with ProcessPoolExecutor(max_workers = workers) as executor:
+        futures = [executor.submit(run, input_file, output_dir, encoders = encoders) for input_file, output_dir in jobs]
+        for (input_file, output_dir), future in zip(jobs, futures):
+            try:
+                future.result()
+                print('%s -> %s' % (input_file, output_dir))
+            except Exception as e:
+                failures.append((input_file, '%s: %s' % (type(e).__name__, e)))
+                print('%s failed: %s' % failures[-1], file = sys.stderr)
+    return failures
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = '执行绘图脚本并将 saveCanvas 的结果保存为 bmp')
+    parser.add_argument('inputs', nargs = '+', help = '脚本路径，可以是多个路径或通配符')
+    parser.add_argument('output_dir', help = '输出目录；多个脚本时每个脚本的结果保存在 output_dir/<脚本名> 中')
+    parser.add_argument('-j', '--workers', type = int, default = None, help = '批量执行或分块合成时的进程数，默认为 CPU 核数')
+    parser.add_argument('--tile-size', type = int, default = 0, help = '单个脚本时将画布按该边长分块并行合成，默认为0（串行）')
+    parser.add_argument('--profile', metavar = 'TRACE', help = '单个脚本时记录各阶段耗时，保存为 Chrome 跟踪格式的 JSON 文件并打印最慢的指令和图元')
+    parser.add_argument('--encoders', type = int, default = 2, help = '每个脚本编码并保存图像的后台线程数，默认为2')
+    parser.add_argument('--checkpoint', metavar = 'SNAPSHOT', help = '单个脚本时定期将场景快照保存到该 .npz 文件')
+    parser.add_argument('--checkpoint-every', type = int, default = 10000, help = '每执行多少条指令保存一次快照，默认为10000')
+    parser.add_argument('--resume-from', metavar = 'SNAPSHOT', help = '单个脚本时从快照恢复场景，并从快照记录的下一行继续执行')
+    args = parser.parse_args()
+
+    if len(args.inputs) == 1 and not glob.has_magic(args.inputs[0]):
+        profiler = Profiler() if args.profile else None
+        try:
+            run(args.inputs[0], args.output_dir, args.tile_size, args.workers, profiler,
+                args.checkpoint, args.checkpoint_every, args.resume_from, args.encoders)
+        except ParseError as e:
+            sys.exit('%s: %s' % (args.inputs[0], e))
+        finally:
+            if profiler is not None:
+                profiler.write_trace(args.profile)
+                print(profiler.summary())
+    elif args.profile or args.checkpoint or args.resume_from or args.tile_size:
+        # 批量执行时进程池已占满 -j 个进程，不再在每个脚本中分块并行
+        parser.error('--profile, --checkpoint, --resume-from and --tile-size only support a single script')
+    else:
+        jobs = batch_outputs(args.inputs, args.output_dir)
+        failures = run_batch(jobs, args.workers, args.encoders)
+        print('%d/%d scripts rendered' % (len(jobs) - len(failures), len(jobs)))
+        if failures:
+            sys.exit(1)
@@ -2,7 +2,10 @@
 # -*- coding:utf-8 -*-
 
 import sys
-import cg_algorithms as alg
+import cg_algorithms_np as alg_np
+import numpy as np
+from cg_spatial import GridIndex
+from cg_canvas import clip_item, prefer_runs
 from typing import Optional
 from PyQt5.QtWidgets import (
     QApplication,
@@ -19,14 +22,24 @@ from PyQt5.QtWidgets import (
     QRubberBand,
     QWidget,
     QStyleOptionGraphicsItem)
-from PyQt5.QtGui import QPainter, QMouseEvent, QColor
-from PyQt5.QtCore import QRectF, QRect, QSize
+from PyQt5.QtGui import QPainter, QMouseEvent, QColor, QPolygon
+from PyQt5.QtCore import QRectF, QRect, QSize, QTimer, QLine
 from PyQt5.Qt import Qt
 from PyQt5 import QtCore
 import math
 
 
 
+def to_qpolygon(pixels):
+    """将 (N, 2) 的 int32 像素数组直接拷贝进 QPolygon 的内存，不为每个像素创建 QPoint"""
+    polygon = QPolygon(len(pixels))
+    if len(pixels) > 0:
+        buffer = polygon.data()
+        buffer.setsize(pixels.nbytes)
+        np.frombuffer(buffer, np.int32).reshape(-1, 2)[:] = pixels
+    return polygon
+
+
 class MyCanvas(QGraphicsView):
     """
     画布窗体类，继承自QGraphicsView，采用QGraphicsView、QGraphicsScene、QGraphicsItem的绘图框架
@@ -38,13 +51,18 @@ class MyCanvas(QGraphicsView):
         self.item_cnt = 0
         self.item_dict = {}
         self.selected_id = ''
+        self.selected_ids = []
+        self.index = GridIndex()    # 图元包围盒的空间索引，用于点选和框选
         self.height = 600
 
         self.status = ''
         self.temp_algorithm = ''
         self.temp_id = ''
         self.temp_item = None
+        self.temp_items = []        # 平移、旋转、缩放同时作用于所有选中的图元
         self.p_list_copy = None
+        self.p_list_copies = []
+        self.region_copies = []
         
         self.color = QColor(0, 0, 0)
         
@@ -56,6 +74,14 @@ class MyCanvas(QGraphicsView):
         self.ystart = -1
         
         self.rb = QRubberBand(QRubberBand.Rectangle, self)
+        self.selecting = False
+
+        # 拖动预览的节流：鼠标移动只记录位置，每帧最多按最新位置重新计算一次
+        self.drag_pos = None
+        self.frame_timer = QTimer(self)
+        self.frame_timer.setSingleShot(True)
+        self.frame_timer.setInterval(16)
+        self.frame_timer.timeout.connect(self.apply_drag)
         
     def get_id(self):
         _id = str(self.item_cnt)
@@ -69,7 +95,7 @@ class MyCanvas(QGraphicsView):
         self.status = status
         self.temp_algorithm = algorithm
         self.temp_id = self.get_id()
-        if self.status == 'curve' or self.status == 'polygon':
+        if self.status == 'curve' or self.status == 'polygon' or self.status == 'filled_polygon':
             self.temp_item = MyItem(self.temp_id, self.status, [], self.temp_algorithm, self.color)
             self.scene().addItem(self.temp_item)
 
@@ -85,61 +111,106 @@ class MyCanvas(QGraphicsView):
         self.temp_algorithm = algorithm
         self.temp_id = self.selected_id
         self.temp_item = self.item_dict[self.temp_id]
+        if self.status == 'clip':
+            self.temp_items = [self.temp_item]
+        else:
+            self.temp_items = [self.item_dict[_id] for _id in self.selected_ids]
+
+    def add_item(self, item):
+        self.item_dict[item.id] = item
+        self.list_widget.addItem(item.id)
+        self.update_index(item)
+
+    def update_index(self, item):
+        bounds = item.bounds()
+        if bounds is None:
+            self.index.remove(item.id)
+        else:
+            self.index.update(item.id, bounds)
+
+    def select(self, ids):
+        """选中一组图元，最后一个作为平移、旋转等操作的对象"""
+        for _id in self.selected_ids:
+            if _id in self.item_dict:
+                self.item_dict[_id].selected = False
+                self.item_dict[_id].update()
+        self.selected_ids = list(ids)
+        for _id in self.selected_ids:
+            self.item_dict[_id].selected = True
+            self.item_dict[_id].update()
+        self.selected_id = self.selected_ids[-1] if self.selected_ids else ''
 
     def clear_selection(self):
-        if self.selected_id != '':
-            self.item_dict[self.selected_id].selected = False
-            self.selected_id = ''
+        self.select([])
 
     def selection_changed(self, selected):
+        if selected not in self.item_dict:
+            return
         self.main_window.statusBar().showMessage('图元选择： %s' % selected)
-        if self.selected_id != '':
-            self.item_dict[self.selected_id].selected = False
-            self.item_dict[self.selected_id].update()
-        self.selected_id = selected
-        self.item_dict[selected].selected = True
-        self.item_dict[selected].update()
+        self.select([selected])
         self.status = ''
-        self.updateScene([self.sceneRect()])
+
+    def update_item(self, item, old_rect):
+        """只重绘图元修改前后的包围盒（含选中时的边框），而不是整个场景"""
+        self.updateScene([old_rect.adjusted(-1, -1, 1, 1), item.boundingRect().adjusted(-1, -1, 1, 1)])
+
+    def select_in_list(self, selected):
+        """同步列表中的当前项，不触发 selection_changed"""
+        self.list_widget.blockSignals(True)
+        found = self.list_widget.findItems(selected, Qt.MatchExactly)
+        if found:
+            self.list_widget.setCurrentItem(found[0])
+        self.list_widget.blockSignals(False)
 
     def mousePressEvent(self, event: QMouseEvent) -> None:
         if event.buttons() == QtCore.Qt.LeftButton:
             pos = self.mapToScene(event.localPos().toPoint())
             x = int(pos.x())
             y = self.height - 1 - int(pos.y())
-            if self.status == 'line' or self.status == 'ellipse':
+            if self.status == '':
+                # 点选包围盒包含鼠标位置的最上层图元，未选中任何图元时开始框选
+                hits = self.index.query_point(x, y)
+                if hits:
+                    selected = max(hits, key = int)
+                    self.select([selected])
+                    self.select_in_list(selected)
+                    self.main_window.statusBar().showMessage('图元选择： %s' % selected)
+                else:
+                    self.selecting = True
+                    self.xstart = x
+                    self.ystart = y
+                    self.origin = event.pos()
+                    self.rb.setGeometry(QRect(self.origin, QSize()))
+                    self.rb.show()
+            elif self.status == 'line' or self.status == 'ellipse' or self.status == 'filled_ellipse':
                 self.temp_item = MyItem(self.temp_id, self.status, [[x, y], [x, y]], self.temp_algorithm, self.color)
                 self.scene().addItem(self.temp_item)
-            elif self.status == 'polygon' or self.status == 'curve':
-                self.temp_item.p_list.append([x, y])
+            elif self.status == 'polygon' or self.status == 'curve' or self.status == 'filled_polygon':
+                old_rect = self.temp_item.boundingRect()
+                self.temp_item.p_list = self.temp_item.p_list + [[x, y]]
+                self.update_item(self.temp_item, old_rect)
             elif self.status == 'translate' or self.status == 'rotate' or self.status == 'scale' or self.status == 'clip':
                 self.p_list_copy = self.temp_item.p_list
+                self.p_list_copies = [item.p_list for item in self.temp_items]
+                self.region_copies = [item.region for item in self.temp_items]
                 self.xcenter = x
                 self.ycenter = y
-                if self.status =='scale' and hasattr(self.p_list_copy, '__len__') and len(self.p_list_copy) > 0:
-                    x_min, y_min = self.p_list_copy[0]
-                    x_max, y_max = self.p_list_copy[0]
-                    for x, y in self.p_list_copy:
-                        x_min = min(x_min, x)
-                        y_min = min(y_min, y)
-                        x_max = max(x_max, x)
-                        y_max = max(y_max, y)
-                        self.w = x_max - x_min
-                        self.h = y_max - y_min
-                    self.w += 2
-                    self.h += 2
+                bounds = [b for b in (item.bounds() for item in self.temp_items) if b is not None]
+                if self.status =='scale' and bounds:
+                    # 多个图元按它们包围盒的并集确定缩放的灵敏度
+                    x_min, y_min, x_max, y_max = zip(*bounds)
+                    self.w = max(x_max) - min(x_min) + 2
+                    self.h = max(y_max) - min(y_min) + 2
                 if self.status == 'clip':
                     self.origin  = event.pos()
                     self.rb.setGeometry(QRect(self.origin, QSize()))
                     self.rb.show()
         elif event.buttons() == QtCore.Qt.RightButton:
-            if self.status == 'polygon' or self.status == 'curve':
-                self.item_dict[self.temp_id] = self.temp_item
-                self.list_widget.addItem(self.temp_id)
+            if self.status == 'polygon' or self.status == 'curve' or self.status == 'filled_polygon':
+                self.add_item(self.temp_item)
                 self.finish_draw()
                 self.temp_item = MyItem(self.temp_id, self.status, [], self.temp_algorithm, self.color)
                 self.scene().addItem(self.temp_item)
-        self.updateScene([self.sceneRect()])
         super().mousePressEvent(event)
 
     def mouseMoveEvent(self, event: QMouseEvent) -> None:
@@ -147,49 +218,102 @@ class MyCanvas(QGraphicsView):
             pos = self.mapToScene(event.localPos().toPoint())
             x = int(pos.x())
             y = self.height - 1 - int(pos.y())
-            if self.status == 'line' or self.status == 'ellipse':
-                self.temp_item.p_list[1] = [x, y]
-            elif self.status == 'translate':
-                self.temp_item.p_list = alg.translate(self.p_list_copy, x - self.xcenter, y - self.ycenter)
-            elif self.status == 'rotate':
-                if self.xstart == -1:
-                    self.xstart = x
-                    self.ystart = y
-                else:
-                    a = self.xstart - self.xcenter
-                    b = self.ystart - self.ycenter
-                    c = x - self.xcenter
-                    d = y - self.ycenter
-                    diff = a * d - b * c
-                    Cos = (a * c + b * d) / math.sqrt(a * a + b * b) / math.sqrt(c * c + d * d)
-                    angle = math.acos(Cos) / math.pi * 180 
-                    if diff < 0:
-                        angle = 360 - angle
-                    angle = 360 - angle
-                    self.temp_item.p_list = alg.rotate(self.p_list_copy, self.xcenter, self.ycenter, angle)
-            elif self.status == 'scale':
-                s = max(0.1 ,1.0 + (x - self.xcenter) / self.w)
-                self.temp_item.p_list = alg.scale(self.p_list_copy, self.xcenter, self.ycenter, s)
+            if self.selecting:
+                self.rb.setGeometry(QRect(self.origin, event.pos()).normalized())
             elif self.status == 'clip':
                 self.xstart = x
                 self.ystart = y
                 self.rb.setGeometry(QRect(self.origin, event.pos()).normalized())
-                
-        self.updateScene([self.sceneRect()])
+            elif self.temp_item is not None:
+                self.drag_pos = (x, y)
+                if not self.frame_timer.isActive():
+                    self.frame_timer.start()
         super().mouseMoveEvent(event)
 
+    def apply_drag(self):
+        """按最近一次鼠标位置更新正在绘制或编辑的图元"""
+        if self.drag_pos is None:
+            return
+        x, y = self.drag_pos
+        self.drag_pos = None
+        if self.status == 'line' or self.status == 'ellipse' or self.status == 'filled_ellipse':
+            old_rect = self.temp_item.boundingRect()
+            self.temp_item.p_list = [self.temp_item.p_list[0], [x, y]]
+            self.update_item(self.temp_item, old_rect)
+        elif self.status == 'translate':
+            self.transform_items(alg_np.translate, x - self.xcenter, y - self.ycenter)
+        elif self.status == 'rotate':
+            if self.xstart == -1:
+                self.xstart = x
+                self.ystart = y
+            else:
+                a = self.xstart - self.xcenter
+                b = self.ystart - self.ycenter
+                c = x - self.xcenter
+                d = y - self.ycenter
+                diff = a * d - b * c
+                Cos = (a * c + b * d) / math.sqrt(a * a + b * b) / math.sqrt(c * c + d * d)
+                angle = math.acos(Cos) / math.pi * 180 
+                if diff < 0:
+                    angle = 360 - angle
+                angle = 360 - angle
+                self.transform_items(alg_np.rotate, self.xcenter, self.ycenter, angle)
+        elif self.status == 'scale':
+            s = max(0.1 ,1.0 + (x - self.xcenter) / self.w)
+            self.transform_items(alg_np.scale, self.xcenter, self.ycenter, s)
+
+    def transform_items(self, function, *args):
+        """对按下鼠标时所有选中图元的参数及裁剪区域一次性施加变换，并重绘它们变换前后的区域"""
+        clipped = [k for k, region in enumerate(self.region_copies) if region is not None]
+        result = alg_np.transform_lists(self.p_list_copies + [self.region_copies[k] for k in clipped], function, *args)
+        for k, region in zip(clipped, result[len(self.temp_items):]):
+            self.temp_items[k].region = region
+        for item, p_list in zip(self.temp_items, result):
+            old_rect = item.boundingRect()
+            item.p_list = p_list.tolist()
+            self.update_item(item, old_rect)
+
     def mouseReleaseEvent(self, event: QMouseEvent) -> None:
-        if self.status == 'line' or self.status == 'ellipse':
-            self.item_dict[self.temp_id] = self.temp_item
-            self.list_widget.addItem(self.temp_id)
+        # 松开鼠标前先应用尚未处理的拖动位置
+        self.frame_timer.stop()
+        self.apply_drag()
+        if self.selecting:
+            # 框选包围盒完全位于选框内的图元
+            self.selecting = False
+            self.rb.hide()
+            pos = self.mapToScene(event.localPos().toPoint())
+            x = int(pos.x())
+            y = self.height - 1 - int(pos.y())
+            selected = sorted(self.index.query_rect(min(x, self.xstart), min(y, self.ystart),
+                                                    max(x, self.xstart), max(y, self.ystart), contain = True), key = int)
+            self.select(selected)
+            if selected:
+                self.select_in_list(selected[-1])
+            self.main_window.statusBar().showMessage('图元选择： %s' % ' '.join(selected))
+            self.xstart = -1
+            self.ystart = -1
+        elif self.status == 'line' or self.status == 'ellipse' or self.status == 'filled_ellipse':
+            self.add_item(self.temp_item)
             self.finish_draw()
         elif self.status == 'rotate':
             self.xstart = -1
             self.ystart = -1
+            for item in self.temp_items:
+                self.update_index(item)
+        elif self.status == 'translate' or self.status == 'scale':
+            for item in self.temp_items:
+                self.update_index(item)
         elif self.status == 'clip':
             self.rb.hide()
-            self.temp_item.p_list = alg.clip(self.p_list_copy, self.xcenter, self.ycenter, self.xstart, self.ystart, self.temp_algorithm)
-        self.updateScene([self.sceneRect()])
+            old_rect = self.temp_item.boundingRect()
+            result = clip_item(self.temp_item.item_type, self.p_list_copy, self.temp_item.region,
+                               self.xcenter, self.ycenter, self.xstart, self.ystart, self.temp_algorithm)
+            if result is None:
+                result = [], None
+            self.temp_item.region = result[1]
+            self.temp_item.p_list = result[0]
+            self.update_index(self.temp_item)
+            self.update_item(self.temp_item, old_rect)
         super().mouseReleaseEvent(event)
 
 
@@ -201,53 +325,130 @@ class MyItem(QGraphicsItem):
         """
 
         :param item_id: 图元ID
-        :param item_type: 图元类型，'line'、'polygon'、'ellipse'、'curve'等
+        :param item_type: 图元类型，'line'、'polygon'、'ellipse'、'curve'、'filled_polygon'、'filled_ellipse'等
         :param p_list: 图元参数
-        :param algorithm: 绘制算法，'DDA'、'Bresenham'、'Bezier'、'B-spline'等
+        :param algorithm: 绘制算法，'DDA'、'Bresenham'、'Bezier'、'B-spline'等，曲线算法可带 alg_np.ADAPTIVE_SUFFIX 后缀
         :param parent:
         """
         super().__init__(parent)
         self.id = item_id           # 图元ID
         self.item_type = item_type  # 图元类型，'line'、'polygon'、'ellipse'、'curve'等
+        self._bounds = None         # 图元参数的包围盒缓存，p_list 被重新赋值时失效
+        self._paint_cache = None    # 绘制用的缓存，已翻转y坐标：QPolygon 像素点，或 list of QLine 像素段（填充图元和长线段），p_list、region 或 algorithm 被重新赋值时失效
+        self._region = None         # 裁剪区域（凸多边形顶点），只有裁剪过的椭圆和曲线才有
         self.p_list = p_list        # 图元参数
         self.algorithm = algorithm  # 绘制算法，'DDA'、'Bresenham'、'Bezier'、'B-spline'等
         self.selected = False
         self.color = color
         self.height = 600
 
+    def filled(self):
+        return self.item_type == 'filled_polygon' or self.item_type == 'filled_ellipse'
+
+    def pixels(self):
+        """光栅化结果（已翻转为场景坐标），只在图元参数或算法改变后重新计算
+
+        :return: (QPolygon) 像素点；填充图元和接近水平或竖直的长线段为 (list of QLine)，每个像素段一条线段
+        """
+        if self._paint_cache is None and self.item_type in ('line', 'polygon') and self.algorithm == 'Bresenham' and self.region is None:
+            if self.item_type == 'line':
+                segments = [self.p_list]
+            else:
+                segments = [[self.p_list[i - 1], self.p_list[i]] for i in range(len(self.p_list))]
+            segments = np.asarray(segments, np.int64).reshape(-1, 2, 2)
+            # 与 cg_canvas.draw_line_items 用同一标准决定是否画线段
+            if len(segments) and prefer_runs(segments, [len(segments)])[0]:
+                runs, offsets = alg_np.draw_line_runs(segments)
+                self._paint_cache = [QLine(x0, self.height - 1 - y0, x1, self.height - 1 - y1) for x0, y0, x1, y1 in runs.tolist()]
+        if self._paint_cache is None and self.filled():
+            if self.item_type == 'filled_polygon':
+                spans = alg_np.fill_polygon(self.p_list)
+            else:
+                spans = alg_np.fill_ellipse(self.p_list)
+            if self.region is not None:
+                spans = alg_np.clip_spans(spans, self.region)
+            self._paint_cache = [QLine(x_start, self.height - 1 - y, x_end, self.height - 1 - y) for y, x_start, x_end in spans.tolist()]
+        elif self._paint_cache is None:
+            if self.item_type == 'line':
+                item_pixels = alg_np.draw_line(self.p_list, self.algorithm)
+            elif self.item_type == 'polygon':
+                item_pixels = alg_np.draw_polygon(self.p_list, self.algorithm, unique = True)
+            elif self.item_type == 'ellipse':
+                item_pixels = alg_np.draw_ellipse(self.p_list)
+            elif self.item_type == 'curve':
+                item_pixels = alg_np.draw_curve(self.p_list, self.algorithm, unique = True)
+            if self.region is not None:
+                item_pixels = item_pixels[alg_np.in_polygon(item_pixels, self.region)]
+            item_pixels[:, 1] = self.height - 1 - item_pixels[:, 1]
+            self._paint_cache = to_qpolygon(item_pixels)
+        return self._paint_cache
+
     def paint(self, painter: QPainter, option: QStyleOptionGraphicsItem, widget: Optional[QWidget] = ...) -> None:
-        if self.item_type == 'line':
-            item_pixels = alg.draw_line(self.p_list, self.algorithm)
-        elif self.item_type == 'polygon':
-            item_pixels = alg.draw_polygon(self.p_list, self.algorithm)
-        elif self.item_type == 'ellipse':
-            item_pixels = alg.draw_ellipse(self.p_list)
-        elif self.item_type == 'curve':
-            item_pixels = alg.draw_curve(self.p_list, self.algorithm)
-        
-        for i in range(len(item_pixels)):
-            item_pixels[i][1] = self.height - 1 - item_pixels[i][1]
         painter.setPen(self.color)
-        for p in item_pixels:
-            painter.drawPoint(*p)
+        pixels = self.pixels()
+        if isinstance(pixels, QPolygon):
+            painter.drawPoints(pixels)
+        else:
+            painter.drawLines(pixels)
         if self.selected:
             painter.setPen(QColor(255, 0, 0))
             painter.drawRect(self.boundingRect())
 
-    def boundingRect(self) -> QRectF:
-        if hasattr(self.p_list, '__len__') and len(self.p_list) > 0:
+    @property
+    def p_list(self):
+        return self._p_list
+
+    @p_list.setter
+    def p_list(self, p_list):
+        # 图元参数只能整体赋值，不要原地修改，否则包围盒缓存不会失效
+        self.prepareGeometryChange()
+        self._p_list = p_list
+        self._bounds = None
+        self._paint_cache = None
+
+    @property
+    def region(self):
+        return self._region
+
+    @region.setter
+    def region(self, region):
+        self.prepareGeometryChange()
+        self._region = region
+        self._bounds = None
+        self._paint_cache = None
+
+    @property
+    def algorithm(self):
+        return self._algorithm
+
+    @algorithm.setter
+    def algorithm(self, algorithm):
+        self._algorithm = algorithm
+        self._paint_cache = None
+        self.update()
+
+    def bounds(self):
+        """图元参数的包围盒 (x_min, y_min, x_max, y_max)，有裁剪区域时再与其包围盒求交，参数为空时返回 None"""
+        if self._bounds is None and hasattr(self.p_list, '__len__') and len(self.p_list) > 0:
             x_min, y_min = self.p_list[0]
             x_max, y_max = self.p_list[0]
-            w = 0
-            h = 0
             for x, y in self.p_list:
                 x_min = min(x_min, x)
                 y_min = min(y_min, y)
                 x_max = max(x_max, x)
                 y_max = max(y_max, y)
-                w = x_max - x_min
-                h = y_max - y_min
-            return QRectF(x_min - 1, self.height - y_max, w + 2, h + 2)
+            if self.region is not None:
+                (rx_min, ry_min), (rx_max, ry_max) = self.region.min(axis=0), self.region.max(axis=0)
+                x_min, y_min = max(x_min, int(rx_min)), max(y_min, int(ry_min))
+                x_max, y_max = min(x_max, int(rx_max)), min(y_max, int(ry_max))
+            self._bounds = (x_min, y_min, x_max, y_max)
+        return self._bounds
+
+    def boundingRect(self) -> QRectF:
+        bounds = self.bounds()
+        if bounds is not None:
+            x_min, y_min, x_max, y_max = bounds
+            return QRectF(x_min - 1, self.height - y_max, x_max - x_min + 2, y_max - y_min + 2)
         else:
             return QRectF(0, 0, 1, 1)
     
@@ -297,6 +498,11 @@ class MainWindow(QMainWindow):
         curve_menu = draw_menu.addMenu('曲线')
         curve_bezier_act = curve_menu.addAction('Bezier')
         curve_b_spline_act = curve_menu.addAction('B-spline')
+        curve_bezier_adaptive_act = curve_menu.addAction('Bezier（自适应采样）')
+        curve_b_spline_adaptive_act = curve_menu.addAction('B-spline（自适应采样）')
+        fill_menu = draw_menu.addMenu('填充')
+        fill_polygon_act = fill_menu.addAction('多边形')
+        fill_ellipse_act = fill_menu.addAction('椭圆')
         
         edit_menu = menubar.addMenu('编辑')
         translate_act = edit_menu.addAction('平移')
@@ -324,6 +530,11 @@ class MainWindow(QMainWindow):
         
         curve_bezier_act.triggered.connect(self.curve_bezier_action)
         curve_b_spline_act.triggered.connect(self.curve_b_spline_action)
+        curve_bezier_adaptive_act.triggered.connect(self.curve_bezier_adaptive_action)
+        curve_b_spline_adaptive_act.triggered.connect(self.curve_b_spline_adaptive_action)
+
+        fill_polygon_act.triggered.connect(self.fill_polygon_action)
+        fill_ellipse_act.triggered.connect(self.fill_ellipse_action)
         
         translate_act.triggered.connect(self.translate_action)
         rotate_act.triggered.connect(self.rotate_action)
@@ -444,7 +655,31 @@ class MainWindow(QMainWindow):
         self.canvas_widget.start_draw('curve', 'B-spline')
         self.list_widget.clearSelection()
         self.canvas_widget.clear_selection()
+
+    def curve_bezier_adaptive_action(self):
+        self.statusBar().showMessage('Bezier算法绘制曲线（自适应采样）')
+        self.canvas_widget.start_draw('curve', 'Bezier' + alg_np.ADAPTIVE_SUFFIX)
+        self.list_widget.clearSelection()
+        self.canvas_widget.clear_selection()
+
+    def curve_b_spline_adaptive_action(self):
+        self.statusBar().showMessage('B-spline算法绘制曲线（自适应采样）')
+        self.canvas_widget.start_draw('curve', 'B-spline' + alg_np.ADAPTIVE_SUFFIX)
+        self.list_widget.clearSelection()
+        self.canvas_widget.clear_selection()
         
+    def fill_polygon_action(self):
+        self.statusBar().showMessage('扫描线算法填充多边形')
+        self.canvas_widget.start_draw('filled_polygon', 'scanline')
+        self.list_widget.clearSelection()
+        self.canvas_widget.clear_selection()
+
+    def fill_ellipse_action(self):
+        self.statusBar().showMessage('扫描线算法填充椭圆')
+        self.canvas_widget.start_draw('filled_ellipse', 'scanline')
+        self.list_widget.clearSelection()
+        self.canvas_widget.clear_selection()
+
     def translate_action(self):
         self.statusBar().showMessage('平移')
         self.canvas_widget.start_modify('translate')
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+
+# 绘图脚本的流式解析器：逐行读取，逐条产生带类型的指令，内存占用与脚本长度无关
+from collections import namedtuple
+
+
+Command = namedtuple('Command', ['name', 'args', 'lineno'])
+Command.__doc__ = '''一条解析后的指令
+
+:param name: (string) 指令名，如'drawLine'
+:param args: (tuple) 按 COMMANDS 中的类型转换后的参数
+:param lineno: (int) 指令在脚本中的行号（从1开始）
+'''
+
+# 变长的坐标参数 x0 y0 x1 y1 ...，解析为 [[x0, y0], [x1, y1], ...]
+POINTS = 'points'
+
+# 指令名到参数类型的映射
+COMMANDS = {
+    'resetCanvas': (int, int),
+    'saveCanvas': (str,),
+    'setColor': (int, int, int),
+    'drawLine': (str, int, int, int, int, str),
+    'drawPolygon': (str, POINTS, str),
+    'drawEllipse': (str, int, int, int, int),
+    'drawCurve': (str, POINTS, str),
+    'fillPolygon': (str, POINTS),
+    'fillEllipse': (str, int, int, int, int),
+    'translate': (str, int, int),
+    'rotate': (str, int, int, int),
+    'scale': (str, int, int, float),
+    'clip': (str, int, int, int, int, str),
+}
+
+
+# 指令名到 (参数个数, 需要转换的参数位置及类型, 坐标参数的位置) 的映射，str 类型的参数无需转换
+_LAYOUTS = {}
+for _name, _types in COMMANDS.items():
+    _LAYOUTS[_name] = (len(_types),
+                       [(i, kind) for i, kind in enumerate(_types) if kind is not str and kind != POINTS],
+                       _types.index(POINTS) if POINTS in _types else None)
+
+
+class ParseError(Exception):
+    """脚本解析错误，错误信息中带有行号"""
+    def __init__(self, lineno, message):
+        super().__init__(lineno, message)
+        self.lineno = lineno
+        self.message = message
+
+    def __str__(self):
+        return 'line %d: %s' % (self.lineno, self.message)
+
+
+def parse_line(tokens, lineno):
+    """将一行的词法单元转换为指令
+
+    :param tokens: (list of string) 以空白分隔的词法单元，第一个为指令名
+    :param lineno: (int) 行号
+    :return: (Command) 解析后的指令
+    """
+    name = tokens[0]
+    layout = _LAYOUTS.get(name)
+    if layout is None:
+        raise ParseError(lineno, 'unknown command %r' % name)
+    count, converters, k = layout
+    args = tokens[1:]
+    try:
+        if k is not None:
+            # 坐标参数前后的参数个数固定，其余均为坐标，收拢为一个参数
+            end = len(args) - (count - k - 1)
+            if end < k or (end - k) % 2 != 0:
+                raise ParseError(lineno, '%s expects pairs of coordinates' % name)
+            xs = map(int, args[k:end:2])
+            ys = map(int, args[k + 1:end:2])
+            args[k:end] = [[[x, y] for x, y in zip(xs, ys)]]
+        elif len(args) != count:
+            raise ParseError(lineno, '%s expects %d arguments, got %d' % (name, count, len(args)))
+        for i, kind in converters:
+            args[i] = kind(args[i])
+    except ValueError as e:
+        raise ParseError(lineno, '%s: %s' % (name, e)) from None
+    return Command(name, tuple(args), lineno)
+
+
+def parse_commands(fp, first_line = 1):
+    """逐行解析脚本，依次产生指令；空行被忽略，参数之间可以有多个空白
+
+    :param fp: (file object) 以文本方式打开的脚本，或任意产生字符串行的可迭代对象
+    :param first_line: (int) 从该行开始解析，之前的行直接跳过（用于断点续跑）
+    :return: (generator of Command) 指令序列
+    """
+    for lineno, line in enumerate(fp, 1):
+        if lineno < first_line:
+            continue
+        tokens = line.split()
+        if tokens:
+            yield parse_line(tokens, lineno)
@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+
+# 命令行的流水线：解析 -> 执行指令（更新场景、光栅化、写入画布） -> 编码并保存图像
+# 解析在后台线程中进行，通过有界队列成批地把指令交给场景；图像的编码和写文件在后台线程池中进行，
+# 画布直接移交给后台线程，不做拷贝，多个画布同时编码，文件按 saveCanvas 的顺序写入
+import io
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait
+from PIL import Image
+
+
+_END = object()
+
+
+def prefetch(iterable, size = 16, chunk = 256):
+    """在后台线程中迭代 iterable，经容量为 size 的队列逐个产生其元素
+
+    元素每 chunk 个一批放入队列，减少线程间同步的次数；后台线程中的异常在取到出错位置时重新抛出。
+    调用方提前结束迭代时，后台线程也随之结束
+
+    :param iterable: (iterable) 被迭代的对象，如 parse_commands 产生的指令序列
+    :param size: (int) 队列中最多缓存的批数
+    :param chunk: (int) 每批的元素个数
+    :return: (generator) 与 iterable 相同的元素序列
+    """
+    batches = queue.Queue(size)
+    stop = threading.Event()
+
+    def produce():
+        batch = []
+        try:
+            for item in iterable:
+                batch.append(item)
+                if len(batch) == chunk:
+                    batches.put((batch, None))
+                    batch = []
+                    if stop.is_set():
+                        return
+            batches.put((batch, _END))
+        except BaseException as e:
+            batches.put((batch, e))
+
+    thread = threading.Thread(target = produce, daemon = True)
+    thread.start()
+    try:
+        while True:
+            batch, end = batches.get()
+            yield from batch
+            if end is _END:
+                return
+            if end is not None:
+                raise end
+    finally:
+        stop.set()
+        # 取走队列中剩余的批，使阻塞在 put 上的后台线程能够结束
+        while thread.is_alive():
+            try:
+                batches.get(timeout = 0.01)
+            except queue.Empty:
+                pass
+        thread.join()
+
+
+class ImageWriter:
+    """
+    在后台线程池中将画布编码为 bmp 并写入文件。
+    各画布在各自的线程中同时编码到内存，只有写文件严格按提交顺序进行（每个画布编码完成后等前一个写完才写入），
+    因此同名的 saveCanvas 总是以最后一次为准；
+    同时在途的画布不超过 max_pending 个，超出时 submit 等待最早的一个完成。
+    提交后画布归后台线程所有，调用方不得再修改它
+    """
+    def __init__(self, workers = 2, max_pending = 4, profiler = None):
+        self.executor = ThreadPoolExecutor(max_workers = workers)
+        self.pending = deque()
+        self.max_pending = max_pending
+        self.profiler = profiler
+
+    def submit(self, canvas, path, name = ''):
+        """提交一个画布
+
+        :param canvas: (np.ndarray of uint8, shape (height, width, 3)) 画布
+        :param path: (string) 保存路径
+        :param name: (string) 记录耗时使用的名称
+        :return: (concurrent.futures.Future) 画布写入文件后完成
+        """
+        while len(self.pending) >= self.max_pending:
+            self.pending.popleft().result()
+        previous = self.pending[-1] if self.pending else None
+        future = self.executor.submit(self.write, canvas, path, previous, name)
+        self.pending.append(future)
+        return future
+
+    def write(self, canvas, path, previous, name):
+        buffer = io.BytesIO()
+        if self.profiler is None:
+            Image.fromarray(canvas).save(buffer, 'bmp')
+        else:
+            with self.profiler.span(name, 'encode'):
+                Image.fromarray(canvas).save(buffer, 'bmp')
+        if previous is not None:
+            # 只等待前一个写完，它的异常由 submit 或 flush 抛出
+            wait([previous])
+        with open(path, 'wb') as f:
+            f.write(buffer.getbuffer())
+
+    def flush(self):
+        """等待所有已提交的画布写入文件，有写入失败时抛出其异常"""
+        while self.pending:
+            self.pending.popleft().result()
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            self.executor.shutdown()
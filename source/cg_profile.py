@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+
+# 绘图脚本执行过程的性能记录：每段耗时记为一个区间，可导出为 Chrome 跟踪格式（chrome://tracing 或 Perfetto 打开），
+# 并汇总最慢的指令和图元
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+
+
+class Profiler:
+    """
+    按类别记录耗时区间，每个区间带有名称和附加信息。
+    类别约定为：'parse'（解析一条指令）、'command'（执行一条指令）、'rasterize'（光栅化一个图元）、
+    'write'（写入画布）、'compose'（分块并行合成画布）、'encode'（编码并保存图像）、'checkpoint'（保存场景快照）
+    """
+    def __init__(self):
+        self.events = []        # Chrome 跟踪格式的完整事件（ph 为 'X'）
+        self.origin = time.perf_counter()
+
+    @contextmanager
+    def span(self, name, category, **args):
+        """记录 with 语句块的耗时
+
+        :param name: (string) 区间名称，如指令名或图元ID
+        :param category: (string) 类别
+        :param args: 附加信息，with 语句块中可以继续向产生的字典中添加（如像素数）
+        """
+        start = time.perf_counter()
+        try:
+            yield args
+        finally:
+            end = time.perf_counter()
+            self.events.append({'name': name, 'cat': category, 'ph': 'X',
+                                'ts': (start - self.origin) * 1e6, 'dur': (end - start) * 1e6,
+                                'pid': os.getpid(), 'tid': threading.get_ident(), 'args': args})
+
+    def iterate(self, iterable, name, category):
+        """逐个产生 iterable 的元素，并记录每次取元素的耗时（如逐行解析脚本）"""
+        iterator = iter(iterable)
+        while True:
+            with self.span(name, category):
+                item = next(iterator, None)
+            if item is None:
+                return
+            yield item
+
+    def write_trace(self, path):
+        """保存为 Chrome 跟踪格式的 JSON 文件"""
+        with open(path, 'w') as fp:
+            json.dump({'traceEvents': self.events, 'displayTimeUnit': 'ms'}, fp)
+
+    def slowest(self, category, count = 10):
+        """某一类别中耗时最长的若干区间，按耗时从长到短排列"""
+        return sorted((e for e in self.events if e['cat'] == category), key = lambda e: e['dur'], reverse = True)[:count]
+
+    def totals(self):
+        """按类别汇总：指令按指令名，图元按类型和算法，其余类别（如按每次保存命名的 compose、write、encode）只按类别
+
+        :return: (list of (string, string, int, float)) 类别、名称、次数、总耗时（毫秒），按总耗时从长到短排列
+        """
+        groups = {}
+        for e in self.events:
+            if e['cat'] == 'rasterize':
+                # 图元按类型和算法汇总，而不是按图元ID
+                key = (e['cat'], '%s/%s' % (e['args'].get('type'), e['args'].get('algorithm')))
+            elif e['cat'] == 'command':
+                key = (e['cat'], e['name'])
+            else:
+                # 区间名称随每次保存变化（如文件名），逐个列出无法看出总耗时，只在跟踪文件中保留
+                key = (e['cat'], '*')
+            count, total = groups.get(key, (0, 0))
+            groups[key] = (count + 1, total + e['dur'] / 1000)
+        return sorted(((c, n, count, total) for (c, n), (count, total) in groups.items()), key = lambda g: g[3], reverse = True)
+
+    def summary(self, count = 10):
+        """文本形式的汇总表：各类别总耗时、最慢的指令、最慢的图元
+
+        :param count: (int) 最慢的指令和图元各列出多少个
+        :return: (string) 汇总表
+        """
+        lines = ['%-10s %-24s %8s %12s' % ('category', 'name', 'count', 'total ms')]
+        for category, name, n, total in self.totals():
+            lines.append('%-10s %-24s %8d %12.3f' % (category, name, n, total))
+        lines.append('')
+        lines.append('slowest commands')
+        lines.append('%8s %-14s %-16s %12s' % ('line', 'command', 'argument', 'ms'))
+        for e in self.slowest('command', count):
+            lines.append('%8s %-14s %-16s %12.3f' % (e['args'].get('line', ''), e['name'], e['args'].get('arg', ''), e['dur'] / 1000))
+        lines.append('')
+        lines.append('slowest items')
+        lines.append('%-16s %-14s %-12s %10s %12s' % ('item', 'type', 'algorithm', 'pixels', 'ms'))
+        for e in self.slowest('rasterize', count):
+            args = e['args']
+            lines.append('%-16s %-14s %-12s %10d %12.3f' % (e['name'], args.get('type'), args.get('algorithm'), args.get('pixels', 0), e['dur'] / 1000))
+        return '\n'.join(lines)
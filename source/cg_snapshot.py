@@ -0,0 +1,228 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+
+# 场景快照：将 cg_cli.Scene 的全部状态保存为一个 .npz 文件，用于断点续跑
+# 所有图元的坐标拼接为一个数组，类型、算法用编码表示，颜色为 (N, 3) 的数组，读写都不逐个图元创建 numpy 对象；
+# 读入的图元保持按列存储，第一次被访问时才创建其 Python 对象（见 _LazyItems）
+import os
+import gc
+from itertools import compress
+from collections.abc import MutableMapping
+from contextlib import contextmanager
+import numpy as np
+
+
+VERSION = 1
+TYPES = ['line', 'polygon', 'ellipse', 'curve', 'filled_polygon', 'filled_ellipse']
+
+
+@contextmanager
+def _gc_paused():
+    """暂停循环垃圾回收：一次创建上百万个列表时，反复触发的回收比创建本身还慢"""
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _pack(p_lists):
+    """将若干点列拼接为 (M, 2) 的坐标数组和每个点列的点数"""
+    counts = np.fromiter((len(p_list) for p_list in p_lists), np.int64, len(p_lists))
+    points = np.array([point for p_list in p_lists for point in p_list], np.int64).reshape(-1, 2)
+    return counts, points
+
+
+def _unpack(counts, points):
+    """_pack 的逆运算，点列为 list of list of int"""
+    points = points.tolist()
+    ends = np.cumsum(counts).tolist()
+    starts = [0] + ends[:-1]
+    return [points[start:end] for start, end in zip(starts, ends)]
+
+
+class _LazyItems(MutableMapping):
+    """
+    快照恢复出的图元字典：键为图元ID，按快照中的顺序排列，值在第一次被访问时才创建为 [item_type, p_list, algorithm, color]。
+    内部的 rows 字典中，尚未创建的图元的值是其在快照中的行号，已创建的是图元本身；对外所有访问（包括 items()、values()、
+    get、pop、setdefault、update、==、dict(x)）都只看到图元。
+    百万个图元的点列和颜色全部创建 Python 对象要数秒（视机器而定），而续跑时多数图元只在下次保存时才被整体遍历一次，
+    因此 load 本身只读入数组；items()、values() 一次性创建所有未创建的图元，单个访问只创建该图元。
+    之后添加、修改、删除图元都与普通字典相同
+    """
+    def __init__(self, ids, types, algorithms, counts, points, colors):
+        self.rows = dict(zip(ids, range(len(ids))))
+        self.ids = ids                  # 快照中的图元ID，全部创建后为 None
+        self.types = types              # 图元类型，list of str
+        self.algorithms = algorithms    # 算法，list
+        self.ends = np.cumsum(counts)   # 第 i 个图元的点为 points[ends[i] - counts[i]:ends[i]]
+        self.counts = counts
+        self.points = points
+        self.colors = colors
+        self.touched = set()            # 已单独创建、被覆盖或被删除的行号
+
+    def create(self, row):
+        end = int(self.ends[row])
+        p_list = self.points[end - int(self.counts[row]):end].tolist()
+        return [self.types[row], p_list, self.algorithms[row], self.colors[row]]
+
+    def create_all(self):
+        if self.ids is None:
+            return
+        keep = np.ones(len(self.ids), bool)
+        keep[list(self.touched)] = False
+        with _gc_paused():
+            if len(self.touched) * 8 > len(self.ids) * 7:
+                rows = np.nonzero(keep)[0].tolist()
+                self.rows.update(zip([self.ids[row] for row in rows], map(self.create, rows)))
+            else:
+                # 一次性将所有点转换为列表再切分，比逐个图元转换快得多；已创建的图元被跳过
+                values = map(list, zip(self.types, _unpack(self.counts, self.points), self.algorithms, self.colors))
+                self.rows.update(compress(zip(self.ids, values), keep.tolist()))
+        self.ids = self.types = self.algorithms = self.ends = self.counts = self.points = self.colors = None
+        self.touched = set()
+
+    def __getitem__(self, key):
+        value = self.rows[key]
+        if type(value) is int:
+            self.touched.add(value)
+            value = self.create(value)
+            self.rows[key] = value
+        return value
+
+    def __setitem__(self, key, value):
+        row = self.rows.get(key)
+        if type(row) is int:
+            self.touched.add(row)
+        self.rows[key] = value
+
+    def __delitem__(self, key):
+        row = self.rows.pop(key)
+        if type(row) is int:
+            self.touched.add(row)
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __contains__(self, key):
+        return key in self.rows
+
+    def items(self):
+        self.create_all()
+        return self.rows.items()
+
+    def values(self):
+        self.create_all()
+        return self.rows.values()
+
+    def copy(self):
+        self.create_all()
+        return self.rows.copy()
+
+
+def save(path, scene, lineno):
+    """保存场景快照；先写入临时文件再替换，写到一半中断时原有快照仍然完整
+
+    :param path: (string) 快照路径，应以 .npz 结尾
+    :param scene: (cg_cli.Scene) 场景
+    :param lineno: (int) 已执行的最后一条指令的行号，续跑时从下一行开始
+    """
+    with _gc_paused():
+        _save(path, scene, lineno)
+
+
+def load(path, scene):
+    """从快照恢复场景状态，像素缓存清空
+
+    :param path: (string) 快照路径
+    :param scene: (cg_cli.Scene) 场景，原有状态被替换
+    :return: (int) 快照中已执行的最后一条指令的行号
+    """
+    with _gc_paused():
+        return _load(path, scene)
+
+
+def _save(path, scene, lineno):
+    ids = list(scene.item_dict)
+    items = list(scene.item_dict.values())
+    index = {item_id: i for i, item_id in enumerate(ids)}
+    # 椭圆没有可选的算法，其算法统一记为空串
+    algorithms = ['' if item[0] == 'ellipse' else item[2] for item in items]
+    algorithm_names, algorithm_codes = np.unique(np.array(algorithms, str), return_inverse = True)
+    counts, points = _pack([item[1] for item in items])
+
+    region_ids = list(scene.regions)
+    region_counts, region_points = _pack([scene.regions[item_id] for item_id in region_ids])
+
+    transform_ids = list(scene.transforms)
+    transforms = [scene.transforms[item_id] for item_id in transform_ids]
+    base_counts, base_points = _pack([base for base, base_region, transform in transforms])
+    # 变换前没有裁剪区域的记点数为 -1
+    base_region_counts, base_region_points = _pack([[] if base_region is None else base_region for base, base_region, transform in transforms])
+    base_region_counts[[base_region is None for base, base_region, transform in transforms]] = -1
+
+    arrays = {
+        'meta': np.array([VERSION, scene.width, scene.height, lineno], np.int64),
+        'pen_color': scene.pen_color,
+        'ids': np.array(ids, str),
+        'types': np.array([TYPES.index(item[0]) for item in items], np.uint8),
+        'algorithm_names': algorithm_names,
+        'algorithms': algorithm_codes.astype(np.int32),
+        'colors': np.array([item[3] for item in items], np.uint8).reshape(-1, 3),
+        'counts': counts,
+        'points': points,
+        'region_items': np.array([index[item_id] for item_id in region_ids], np.int64),
+        'region_counts': region_counts,
+        'region_points': region_points,
+        'transform_items': np.array([index[item_id] for item_id in transform_ids], np.int64),
+        'transform_unresolved': np.array([item_id in scene.unresolved for item_id in transform_ids], bool),
+        'transform_base_counts': base_counts,
+        'transform_base_points': base_points,
+        'transform_region_counts': base_region_counts,
+        'transform_region_points': base_region_points,
+        'transform_matrices': np.array([transform[0] for base, base_region, transform in transforms], np.float64).reshape(-1, 3, 3),
+        'transform_pivots': np.array([transform[1] for base, base_region, transform in transforms], np.float64).reshape(-1, 2),
+    }
+    temp = path + '.tmp.npz'
+    np.savez(temp, **arrays)
+    os.replace(temp, path)
+
+
+def _load(path, scene):
+    with np.load(path) as npz:
+        # NpzFile 每次按名字取数组都会重新从文件中读取，这里每个数组只读一次
+        data = {name: npz[name] for name in npz.files}
+    version, width, height, lineno = data['meta'].tolist()
+    if version != VERSION:
+        raise ValueError('unsupported snapshot version %d' % version)
+    scene.reset_canvas(width, height)
+    scene.pen_color = data['pen_color'].copy()
+
+    ids = data['ids'].tolist()
+    types = [TYPES[code] for code in data['types'].tolist()]
+    # 只有椭圆的算法记为空串，恢复为0
+    names = [name if name else 0 for name in data['algorithm_names'].tolist()]
+    algorithms = [names[code] for code in data['algorithms'].tolist()]
+    scene.item_dict = _LazyItems(ids, types, algorithms, data['counts'], data['points'], data['colors'])
+
+    regions = np.split(data['region_points'], np.cumsum(data['region_counts'])[:-1]) if len(data['region_counts']) else []
+    scene.regions = {ids[i]: region for i, region in zip(data['region_items'].tolist(), regions)}
+
+    bases = _unpack(data['transform_base_counts'], data['transform_base_points'])
+    region_counts = data['transform_region_counts'].tolist()
+    base_regions = np.split(data['transform_region_points'], np.cumsum(np.maximum(data['transform_region_counts'], 0))[:-1]) if len(region_counts) else []
+    matrices = data['transform_matrices']
+    pivots = data['transform_pivots'].tolist()
+    unresolved = data['transform_unresolved'].tolist()
+    for k, i in enumerate(data['transform_items'].tolist()):
+        base_region = None if region_counts[k] < 0 else base_regions[k]
+        transform = (matrices[k], tuple(pivots[k]))
+        scene.transforms[ids[i]] = [bases[k], base_region, transform]
+        if unresolved[k]:
+            scene.unresolved.add(ids[i])
+    return lineno
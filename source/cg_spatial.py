@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+
+# 图元包围盒的空间索引，用于按点或矩形查找图元
+
+
+class GridIndex:
+    """
+    均匀网格空间索引：平面被划分为边长为 cell_size 的网格，每个格子记录包围盒与之相交的图元。
+    插入、删除、更新只涉及图元包围盒覆盖的格子，查询只检查与查询区域相交的格子
+    """
+    def __init__(self, cell_size: int = 32):
+        self.cell_size = cell_size
+        self.cells = {}     # (格子列号, 格子行号) -> 图元ID集合
+        self.bounds = {}    # 图元ID -> 包围盒 (x_min, y_min, x_max, y_max)
+
+    def __len__(self):
+        return len(self.bounds)
+
+    def __contains__(self, key):
+        return key in self.bounds
+
+    def _cell_range(self, x_min, y_min, x_max, y_max):
+        size = self.cell_size
+        return range(x_min // size, x_max // size + 1), range(y_min // size, y_max // size + 1)
+
+    def insert(self, key, bounds):
+        """插入图元
+
+        :param key: 图元ID
+        :param bounds: (tuple of int: (x_min, y_min, x_max, y_max)) 图元包围盒（闭区间）
+        """
+        self.bounds[key] = bounds
+        columns, rows = self._cell_range(*bounds)
+        for cx in columns:
+            for cy in rows:
+                self.cells.setdefault((cx, cy), set()).add(key)
+
+    def remove(self, key):
+        """删除图元，图元不存在时不做任何事"""
+        bounds = self.bounds.pop(key, None)
+        if bounds is None:
+            return
+        columns, rows = self._cell_range(*bounds)
+        for cx in columns:
+            for cy in rows:
+                cell = self.cells[(cx, cy)]
+                cell.discard(key)
+                if not cell:
+                    del self.cells[(cx, cy)]
+
+    def update(self, key, bounds):
+        """图元的包围盒发生变化后更新索引"""
+        old = self.bounds.get(key)
+        if old == bounds:
+            return
+        if old is not None and self._cell_range(*old) == self._cell_range(*bounds):
+            self.bounds[key] = bounds
+            return
+        self.remove(key)
+        self.insert(key, bounds)
+
+    def clear(self):
+        self.cells = {}
+        self.bounds = {}
+
+    def query_point(self, x, y):
+        """查找包围盒包含点 (x, y) 的图元
+
+        :return: (list) 图元ID列表，顺序不定
+        """
+        size = self.cell_size
+        result = []
+        for key in self.cells.get((x // size, y // size), ()):
+            x_min, y_min, x_max, y_max = self.bounds[key]
+            if x_min <= x <= x_max and y_min <= y <= y_max:
+                result.append(key)
+        return result
+
+    def query_rect(self, x_min, y_min, x_max, y_max, contain = False):
+        """查找包围盒与矩形相交的图元
+
+        :param contain: (bool) 为 True 时只返回包围盒完全位于矩形内的图元
+        :return: (list) 图元ID列表，顺序不定
+        """
+        columns, rows = self._cell_range(x_min, y_min, x_max, y_max)
+        if len(columns) * len(rows) > len(self.cells):
+            # 查询矩形覆盖的格子比已有的格子还多时，直接遍历已有的格子
+            candidates = set().union(*[cell for (cx, cy), cell in self.cells.items() if cx in columns and cy in rows])
+        else:
+            candidates = set().union(*[self.cells.get((cx, cy), ()) for cx in columns for cy in rows])
+        result = []
+        for key in candidates:
+            bx_min, by_min, bx_max, by_max = self.bounds[key]
+            if contain:
+                hit = x_min <= bx_min and bx_max <= x_max and y_min <= by_min and by_max <= y_max
+            else:
+                hit = bx_min <= x_max and x_min <= bx_max and by_min <= y_max and y_min <= by_max
+            if hit:
+                result.append(key)
+        return result